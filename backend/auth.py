@@ -1,12 +1,17 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import APIKeyHeader
+from typing import Optional
+from fastapi import Depends, Form, HTTPException, status
+from fastapi.security import APIKeyHeader, APIKeyQuery
+from backend import couples
 
 # Simple API key header for couple code authentication
 API_KEY_HEADER = APIKeyHeader(name="X-Couple-Code", auto_error=False)
+# Calendar apps subscribing to a feed can't set headers, so feeds also take ?code=
+API_KEY_QUERY = APIKeyQuery(name="code", auto_error=False)
 
 async def validate_couple_code(api_key: str = Depends(API_KEY_HEADER)):
     """
     Validate the couple code from the X-Couple-Code header.
+    The code must be registered in couples (see backend/couples.py).
     This is a simple authentication mechanism - in a production app,
     you would want something more secure.
     """
@@ -16,7 +21,43 @@ async def validate_couple_code(api_key: str = Depends(API_KEY_HEADER)):
             detail="Missing couple code",
             headers={"WWW-Authenticate": "Couple-Code"},
         )
-    
-    # You could add additional validation logic here if needed
-    # For now, we just return the code if it exists
-    return api_key
+    return await _registered(api_key)
+
+async def _registered(code: str) -> str:
+    # A set lookup, so unknown codes never reach the database
+    if not await couples.index.contains(code):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unknown couple code",
+            headers={"WWW-Authenticate": "Couple-Code"},
+        )
+    return code
+
+async def _required(code: Optional[str]) -> str:
+    if not code:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Couple code is required"
+        )
+    return await _registered(code)
+
+async def validate_feed_code(
+    api_key: str = Depends(API_KEY_HEADER),
+    query_key: str = Depends(API_KEY_QUERY)
+):
+    """Like validate_couple_code, but also accepts the code as a query parameter."""
+    return await validate_couple_code(api_key or query_key)
+
+# Older endpoints take the code as ?code=, ?couple_code= or a form field
+# rather than the header; it must still be a registered couple
+async def validate_code_param(code: Optional[str] = None):
+    """The couple code from ?code=, which must be registered."""
+    return await _required(code)
+
+async def validate_couple_code_param(couple_code: Optional[str] = None):
+    """The couple code from ?couple_code=, which must be registered."""
+    return await _required(couple_code)
+
+async def validate_couple_code_form(couple_code: str = Form(...)):
+    """The couple code from a multipart form's couple_code field, which must be registered."""
+    return await _required(couple_code)
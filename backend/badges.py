@@ -0,0 +1,183 @@
+from collections import Counter
+from itertools import chain
+from typing import NamedTuple
+from sqlalchemy import delete, event, inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend import schemas
+from backend.database import Base
+from backend.challenge_models import Streak
+from backend.models import CoupleCounter
+
+# Badge engine.
+#
+# Badges are thresholds on per-couple counters kept in couple_counters.
+# Every flush that inserts, updates or deletes a counted row applies the
+# row's before/after difference to those counters in the same
+# transaction, so looking up a couple's badges is a single primary-key
+# range read and never scans the content tables.
+
+# --- Counters ---
+# Each tally maps a row (through a getter for its column values) to the
+# counters it contributes 1 to
+TALLIES = {}
+
+def tally(table: str, *fields: str):
+    def decorator(fn):
+        TALLIES[table] = (fields, fn)
+        return fn
+    return decorator
+
+@tally("activities", "status", "category")
+def _activity(get):
+    if get("status") == "completed":
+        yield "activities_completed"
+        if get("category"):
+            yield f"activities_completed:{get('category')}"
+
+@tally("books", "status")
+def _book(get):
+    if get("status") == "completed":
+        yield "books_read"
+
+@tally("movies", "status")
+def _movie(get):
+    if get("status") == "watched":
+        yield "movies_watched"
+
+@tally("challenge_progress", "completed_at")
+def _challenge(get):
+    if get("completed_at") is not None:
+        yield "challenges_completed"
+
+@tally("goals", "completed")
+def _goal(get):
+    if get("completed"):
+        yield "goals_completed"
+
+@tally("photos")
+def _photo(get):
+    yield "photos"
+
+@tally("blog_entries")
+def _blog_entry(get):
+    yield "blog_entries"
+
+# --- Rules ---
+class Badge(NamedTuple):
+    key: str
+    counter: str
+    threshold: int
+
+# Keys match the frontend's badge list (frontend-vite/src/components/Badges.tsx)
+BADGES = [
+    Badge("first_date", "activities_completed", 1),
+    Badge("movie_buffs", "movies_watched", 10),
+    Badge("bookworms", "books_read", 5),
+    Badge("challenge_accepted", "challenges_completed", 1),
+    Badge("goal_crushers", "goals_completed", 5),
+    Badge("memory_makers", "photos", 10),
+    Badge("consistent_communicator", "streak:blog", 7),
+    Badge("streak_master", "streak:activity", 30),
+    Badge("storytellers", "blog_entries", 25),
+]
+
+# Five completed activities in one category
+CATEGORY_BADGES = {
+    schemas.Category.OUTDOOR: "outdoor_adventurers",
+    schemas.Category.INDOOR: "homebodies",
+    schemas.Category.DINING: "foodies",
+    schemas.Category.ENTERTAINMENT: "fun_seekers",
+    schemas.Category.TRAVEL: "globetrotters",
+}
+BADGES += [
+    Badge(key, f"activities_completed:{category.value}", 5)
+    for category, key in CATEGORY_BADGES.items()
+]
+
+async def get_counters(db: AsyncSession, code: str) -> dict:
+    result = await db.execute(
+        select(CoupleCounter.counter, CoupleCounter.value).filter(CoupleCounter.couple_code == code)
+    )
+    counters = dict(result.all())
+    # Streak badges go by the longest run, kept in backend/streaks.py
+    result = await db.execute(
+        select(Streak.streak, Streak.longest).filter(Streak.couple_code == code)
+    )
+    counters.update((f"streak:{streak}", longest) for streak, longest in result.all())
+    return counters
+
+async def calculate_badges(db: AsyncSession, code: str):
+    """Keys of the badges a couple has earned."""
+    counters = await get_counters(db, code)
+    return [badge.key for badge in BADGES if counters.get(badge.counter, 0) >= badge.threshold]
+
+# --- Write hooks ---
+def _old_value(obj, field: str):
+    history = inspect(obj).attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, field)
+
+def _deltas(session):
+    deltas = Counter()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table not in TALLIES or not obj.couple_code:
+            continue
+        fields, fn = TALLIES[table]
+        new = lambda field: getattr(obj, field)
+        old = lambda field: _old_value(obj, field)
+        if obj in session.new:
+            changes = Counter(fn(new))
+        elif obj in session.deleted:
+            changes = Counter()
+            changes.subtract(fn(old))
+        else:
+            if not any(inspect(obj).attrs[field].history.has_changes() for field in fields):
+                continue
+            changes = Counter(fn(new))
+            changes.subtract(fn(old))
+        for counter, delta in changes.items():
+            if delta:
+                deltas[(obj.couple_code, counter)] += delta
+    return deltas
+
+def _upsert(conn, code: str, counter: str, delta: int):
+    stmt = insert(CoupleCounter).values(couple_code=code, counter=counter, value=delta)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[CoupleCounter.couple_code, CoupleCounter.counter],
+        set_={"value": CoupleCounter.value + delta},
+    ))
+
+@event.listens_for(Session, "after_flush")
+def _update_counters(session, flush_context):
+    deltas = _deltas(session)
+    if not deltas:
+        return
+    conn = session.connection(bind_arguments={"writer": True})
+    for (code, counter), delta in deltas.items():
+        _upsert(conn, code, counter, delta)
+
+# --- Backfill ---
+def rebuild(conn):
+    """Recompute every couple's counters from the content tables (sync connection)."""
+    totals = Counter()
+    for table, (fields, fn) in TALLIES.items():
+        columns = Base.metadata.tables[table].c
+        rows = conn.execute(select(columns.couple_code, *(columns[field] for field in fields)))
+        for row in rows:
+            if row.couple_code:
+                mapping = row._mapping
+                for counter in fn(mapping.get):
+                    totals[(row.couple_code, counter)] += 1
+
+    conn.execute(delete(CoupleCounter))
+    values = [
+        {"couple_code": code, "counter": counter, "value": value}
+        for (code, counter), value in totals.items()
+    ]
+    if values:
+        conn.execute(insert(CoupleCounter), values)
@@ -0,0 +1,191 @@
+import asyncio
+import glob
+import hashlib
+import os
+import sys
+from collections import Counter
+from itertools import chain
+from typing import NamedTuple
+from fastapi import UploadFile
+from sqlalchemy import delete, event, inspect, text, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from backend import changes, storage
+from backend.database import engine
+from backend.models import Photo, PhotoBlob, PhotoVariant
+from backend.storage import UPLOAD_DIR
+from backend.thumbnails import VARIANT_DIR
+
+# Content-addressed photo storage.
+#
+# A photo's bytes are stored once per distinct content, as
+# uploads/{sha256}{extension}, and described by a row in photo_blobs.
+# Photos point at their blob through photos.checksum, and the blob's
+# refcount, the number of photos doing so, is kept current by a write
+# hook in the same flush. Uploading bytes that are already stored only
+# adds a reference, and since names come from the content, two uploads
+# can no longer overwrite each other's files. Blobs nobody references
+# any more are kept (a re-upload reuses them) until pruned:
+#
+#   python -m backend.blobs --prune
+
+BACKEND_DIR = os.path.dirname(UPLOAD_DIR)
+
+class StoredBlob(NamedTuple):
+    file_path: str  # relative to the backend directory, as photos.file_path
+    sha256: str
+    created: bool  # False when the content was already stored
+
+def blob_name(sha256: str, filename: str) -> str:
+    # Keep the extension so the file is served with the right media type
+    extension = os.path.splitext(storage.safe_name(filename))[1].lower()
+    return sha256 + extension
+
+def _discard_with_variants(path: str):
+    storage.discard(path)
+    for variant in glob.glob(os.path.join(VARIANT_DIR, glob.escape(os.path.basename(path)) + ".*")):
+        storage.discard(variant)
+
+async def place(db: AsyncSession, received: storage.StoredFile, filename: str) -> StoredBlob:
+    """Move a received upload into blob storage, or drop it if the content is already there."""
+    try:
+        blob = await db.get(PhotoBlob, received.sha256)
+        file_path = blob.file_path if blob else f"uploads/{blob_name(received.sha256, filename)}"
+        path = os.path.join(BACKEND_DIR, file_path)
+        if blob and await run_in_threadpool(os.path.exists, path):
+            await run_in_threadpool(storage.discard, received.path)
+        else:
+            await run_in_threadpool(os.replace, received.path, path)
+    except BaseException:
+        storage.discard(received.path)
+        raise
+    created = False
+    if blob is None:
+        # References are counted as photos are flushed; see _count_references.
+        # A concurrent upload of the same content may have inserted the row
+        # since the lookup above: only the insert that wins created the blob.
+        result = await db.execute(insert(PhotoBlob).values(
+            sha256=received.sha256, file_path=file_path, size=received.size, refcount=0,
+        ).on_conflict_do_nothing())
+        created = result.rowcount == 1
+    return StoredBlob(file_path, received.sha256, created)
+
+async def store(db: AsyncSession, file: UploadFile, max_bytes: int) -> StoredBlob:
+    """Stream an upload into blob storage, reusing the blob if the content is already there."""
+    received = await storage.receive_upload(file, UPLOAD_DIR, max_bytes)
+    return await place(db, received, file.filename)
+
+# --- Write hooks ---
+def _old_checksum(obj):
+    history = inspect(obj).attrs.checksum.history
+    return history.deleted[0] if history.deleted else obj.checksum
+
+@event.listens_for(Session, "after_flush")
+def _count_references(session, flush_context):
+    deltas = Counter()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Photo):
+            continue
+        if obj in session.new:
+            deltas[obj.checksum] += 1
+        elif obj in session.deleted:
+            deltas[_old_checksum(obj)] -= 1
+        elif inspect(obj).attrs.checksum.history.has_changes():
+            deltas[_old_checksum(obj)] -= 1
+            deltas[obj.checksum] += 1
+    deltas.pop(None, None)
+    deltas = {sha256: delta for sha256, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    conn = session.connection(bind_arguments={"writer": True})
+    for sha256, delta in deltas.items():
+        conn.execute(
+            update(PhotoBlob).where(PhotoBlob.sha256 == sha256).values(refcount=PhotoBlob.refcount + delta)
+        )
+
+# --- Backfill ---
+def hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(storage.UPLOAD_CHUNK), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def rebuild(conn):
+    """Recount every blob's references from photos (sync connection)."""
+    conn.execute(text(
+        "UPDATE photo_blobs SET refcount = "
+        "(SELECT COUNT(*) FROM photos WHERE photos.checksum = photo_blobs.sha256)"
+    ))
+
+def dedupe(conn):
+    """Move every stored photo into blob storage, keeping one file per content (sync connection).
+
+    Returns the paths the photos no longer use. They must stay on disk
+    until the transaction commits; see discard_retired.
+    """
+    blobs = dict(conn.execute(select(PhotoBlob.sha256, PhotoBlob.file_path)).all())
+    retired = set()
+    touched = set()
+    for row in conn.execute(select(Photo.id, Photo.file_path, Photo.couple_code)).all():
+        path = os.path.join(BACKEND_DIR, row.file_path)
+        if not os.path.isfile(path):
+            # Nothing to point at; the row keeps its path and no checksum
+            continue
+        sha256, size = hash_file(path)
+        if sha256 not in blobs:
+            file_path = f"uploads/{blob_name(sha256, row.file_path)}"
+            target = os.path.join(BACKEND_DIR, file_path)
+            if not os.path.exists(target):
+                # A second name for the same file; the old one is only
+                # removed once the new paths have committed
+                os.link(path, target)
+            conn.execute(insert(PhotoBlob).values(sha256=sha256, file_path=file_path, size=size, refcount=0))
+            blobs[sha256] = file_path
+        values = {"checksum": sha256}
+        if blobs[sha256] != row.file_path:
+            values["file_path"] = blobs[sha256]
+            # Variants are named after the file, and re-rendered on demand
+            conn.execute(delete(PhotoVariant).where(PhotoVariant.photo_id == row.id))
+            retired.add(path)
+        conn.execute(update(Photo).where(Photo.id == row.id).values(**values))
+        if row.couple_code:
+            touched.add(row.couple_code)
+    # Raw updates skip the write hooks: move the ETags of the changed lists
+    for code in touched:
+        changes.bump(conn, code, "photos")
+    rebuild(conn)
+    in_use = {os.path.join(BACKEND_DIR, file_path) for file_path in blobs.values()}
+    return sorted(retired - in_use)
+
+def discard_retired(paths):
+    """Remove the old files dedupe moved photos off, after its transaction committed."""
+    for path in paths:
+        _discard_with_variants(path)
+
+# --- Pruning ---
+def prune(conn):
+    """Delete unreferenced blob rows (sync connection); returns their file paths."""
+    result = conn.execute(
+        delete(PhotoBlob).where(PhotoBlob.refcount <= 0).returning(PhotoBlob.file_path)
+    )
+    return [row.file_path for row in result]
+
+async def _prune():
+    async with engine.begin() as conn:
+        file_paths = await conn.run_sync(prune)
+    # Files go only after the rows are gone for good
+    for file_path in file_paths:
+        _discard_with_variants(os.path.join(BACKEND_DIR, file_path))
+    return len(file_paths)
+
+if __name__ == "__main__":
+    if "--prune" not in sys.argv[1:]:
+        print("usage: python -m backend.blobs --prune")
+        sys.exit(2)
+    print(f"✓ Pruned {asyncio.run(_prune())} unreferenced blobs")
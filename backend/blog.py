@@ -1,26 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend import models
 from backend import schemas
+from backend import pagination, projections, etags, serialization
+from .auth import validate_code_param
 from backend.database import get_db
 
 router = APIRouter()
 
 @router.get("/blog-entries/", response_model=List[schemas.BlogEntry])
-async def get_blog_entries(db: AsyncSession = Depends(get_db), code: Optional[str] = None):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
-    return await models.get_blog_entries(db, code)
+async def get_blog_entries(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    code: str = Depends(validate_code_param),
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None
+):
+    unchanged = await etags.check(request, response, db, code, "blog_entries")
+    if unchanged:
+        return unchanged
+    columns = projections.BLOG_ENTRIES.columns(fields, view)
+    page = await models.get_blog_entries(db, code, limit, cursor, columns)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, None if columns else schemas.BlogEntry, response)
 
 @router.post("/blog-entries/", response_model=schemas.BlogEntry)
 async def create_blog_entry(
     entry: schemas.BlogEntryCreate,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None
+    code: str = Depends(validate_code_param)
 ):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
     try:
         return await models.create_blog_entry(db, entry, code)
     except Exception as e:
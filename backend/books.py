@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend import models
 from backend import schemas
+from backend import pagination, projections, etags, serialization
+from .auth import validate_code_param
 from backend.database import get_db
 
 router = APIRouter()
@@ -12,10 +14,8 @@ async def update_book(
     book_id: int,
     book: schemas.BookUpdate,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None
+    code: str = Depends(validate_code_param)
 ):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
     try:
         return await models.update_book(db, book_id, book, code)
     except HTTPException:
@@ -25,19 +25,30 @@ async def update_book(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/books/", response_model=List[schemas.Book])
-async def get_books(db: AsyncSession = Depends(get_db), code: Optional[str] = None):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
-    return await models.get_books(db, code)
+async def get_books(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    code: str = Depends(validate_code_param),
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None
+):
+    unchanged = await etags.check(request, response, db, code, "books")
+    if unchanged:
+        return unchanged
+    columns = projections.BOOKS.columns(fields, view)
+    page = await models.get_books(db, code, limit, cursor, columns)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, None if columns else schemas.Book, response)
 
 @router.post("/books/", response_model=schemas.Book)
 async def create_book(
     book: schemas.BookCreate,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None
+    code: str = Depends(validate_code_param)
 ):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
     try:
         return await models.create_book(db, book, code)
     except Exception as e:
@@ -0,0 +1,196 @@
+import functools
+import inspect
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from sqlalchemy import event, text
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+# In-process read cache for couple-scoped list queries.
+#
+# Entries are keyed by (collection, function, arguments) plus the couple's
+# collection version, read from the database on every call (the ETag check
+# has usually read it already in the same transaction). A write committed
+# by any worker process bumps that version, so older entries simply stop
+# matching. They are also grouped by (couple_code, collection) so that a
+# write committed in this process drops them right away (wired up in
+# backend/changes.py). LRU eviction keeps the approximate size under a
+# byte budget, and a TTL frees entries nobody asks for anymore. ORM rows
+# are stored as read-only named tuples of their column values, so no
+# session-bound object is shared between requests.
+
+READ_CACHE_MAX_BYTES = int(os.environ.get("READ_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", "30"))  # seconds
+
+def approximate_size(value) -> int:
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value.values())
+    if hasattr(value, "_sa_instance_state"):
+        return sys.getsizeof(value) + sum(
+            approximate_size(item) for key, item in vars(value).items() if key != "_sa_instance_state"
+        )
+    if hasattr(value, "_asdict"):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class ReadCache:
+    def __init__(self, max_bytes: int = READ_CACHE_MAX_BYTES, ttl: float = READ_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, scope, value)
+        self._scopes = defaultdict(set)  # (couple_code, collection) -> keys
+        self._invalidated_at = {}  # (couple_code, collection) -> epoch
+        self.epoch = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[3]
+
+    def set(self, key, scope, value, since_epoch: int):
+        # Drop results read before a write to the same scope committed
+        if self._invalidated_at.get(scope, -1) > since_epoch:
+            return
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, scope, value)
+        self._scopes[scope].add(key)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, code: str, collection: str):
+        scope = (code, collection)
+        self.epoch += 1
+        self._invalidated_at[scope] = self.epoch
+        for key in self._scopes.pop(scope, ()):
+            entry = self._entries.pop(key, None)
+            if entry:
+                self.bytes -= entry[1]
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._scopes.clear()
+        self.bytes = 0
+
+    def _remove(self, key):
+        expires_at, size, scope, value = self._entries.pop(key)
+        self.bytes -= size
+        keys = self._scopes.get(scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[scope]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+read_cache = ReadCache()
+
+# Remember the cache epoch when each session transaction starts. Its reads
+# see a snapshot from no earlier than this, so a result can be stored only
+# if its scope was not invalidated afterwards. Versions read in the
+# previous transaction no longer apply.
+@event.listens_for(Session, "after_transaction_create")
+def _record_epoch(session, transaction):
+    if transaction.parent is None:
+        session.info["cache_epoch"] = read_cache.epoch
+        session.info.pop("collection_versions", None)
+
+def note_version(db, code: str, collection: str, version: int):
+    """Remember a collection version read in the current transaction."""
+    db.info.setdefault("collection_versions", {})[(code, collection)] = version
+
+async def collection_version(db, code: str, collection: str) -> int:
+    version = db.info.get("collection_versions", {}).get((code, collection))
+    if version is None:
+        result = await db.execute(
+            text("SELECT version FROM collection_versions WHERE couple_code = :code AND collection = :collection"),
+            {"code": code, "collection": collection},
+        )
+        version = result.scalar() or 0
+        note_version(db, code, collection, version)
+    return version
+
+@functools.lru_cache(maxsize=None)
+def _row_type(cls):
+    return namedtuple(f"{cls.__name__}Row", [attr.key for attr in sa_inspect(cls).column_attrs])
+
+def snapshot(item):
+    """A read-only copy of an ORM row's column values; other rows are returned as is."""
+    if not hasattr(item, "_sa_instance_state"):
+        return item
+    row_type = _row_type(type(item))
+    return row_type._make(getattr(item, name) for name in row_type._fields)
+
+def _key_part(value):
+    if isinstance(value, (list, tuple)):
+        # Projection column lists: key on the column / label names
+        return tuple(getattr(item, "key", None) or str(item) for item in value)
+    return value
+
+def cached(collection: str):
+    """Cache an async couple-scoped query function taking (db, code, ...)."""
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(db, *args, **kwargs):
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != "db"}
+            code = arguments.get("code")
+            key = (collection, fn.__name__, tuple((name, _key_part(value)) for name, value in arguments.items()))
+
+            # This transaction's own uncommitted writes must not be cached
+            if (code, collection) in db.info.get("touched_collections", ()):
+                return await fn(db, *args, **kwargs)
+
+            since_epoch = db.info.get("cache_epoch", read_cache.epoch) if db.in_transaction() else read_cache.epoch
+            key += (await collection_version(db, code, collection),)
+            hit = read_cache.get(key)
+            if hit is not None:
+                return hit
+
+            result = await fn(db, *args, **kwargs)
+            if hasattr(result, "_replace"):
+                result = result._replace(items=[snapshot(item) for item in result.items])
+            read_cache.set(key, (code, collection), result, since_epoch)
+            return result
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
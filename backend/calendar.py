@@ -1,23 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import List, Optional
-from backend.database import get_db
-from backend import models, schemas
-from .auth import validate_couple_code
+from backend.database import AsyncSessionLocal, get_db
+from backend import models, schemas, pagination, projections, etags, serialization, changes, ics
+from .auth import validate_couple_code, validate_feed_code
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.CalendarEventOut])
 async def get_events(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None,
     code: str = Depends(validate_couple_code),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all calendar events for a couple between optional start and end dates"""
-    events = await models.get_calendar_events(db, code, start_date, end_date)
-    return events
+    """Get calendar events for a couple between optional start and end dates, one page at a time"""
+    unchanged = await etags.check(request, response, db, code, "calendar_events")
+    if unchanged:
+        return unchanged
+    columns = projections.CALENDAR_EVENTS.columns(fields, view)
+    page = await models.get_calendar_events(db, code, start_date, end_date, limit, cursor, columns)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, None if columns else schemas.CalendarEventOut, response)
+
+@router.get("/feed.ics", response_class=StreamingResponse)
+async def get_feed(
+    request: Request,
+    code: str = Depends(validate_feed_code)
+):
+    """iCalendar feed of the couple's shared events, for calendar app subscriptions"""
+    # Not get_db: that session would stay open, holding a read connection,
+    # until the streamed body ends, while ics.feed needs one of its own
+    async with AsyncSessionLocal() as db:
+        version, updated_at = await changes.get_version(db, code, "calendar_events")
+    etag = etags.make_etag("calendar_events", code, version, "feed.ics")
+    # Clients poll often; make them revalidate, which is cheap when unchanged
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    stamp = (updated_at or datetime(1970, 1, 1)).replace(microsecond=0)
+    if updated_at is not None:
+        headers["Last-Modified"] = etags.http_date(stamp)
+    if etags.matches(request, etag) or (updated_at is not None and etags.unmodified_since(request, stamp)):
+        return etags.not_modified(etag, headers)
+    return StreamingResponse(ics.feed(code, stamp), media_type="text/calendar", headers=headers)
 
 @router.post("/", response_model=schemas.CalendarEventOut, status_code=status.HTTP_201_CREATED)
 async def create_event(
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.database import Base
@@ -22,7 +22,7 @@ class ChallengeProgress(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     challenge_id = Column(Integer, ForeignKey('challenges.id'))
-    couple_code = Column(String, index=True)
+    couple_code = Column(String)
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     progress_data = Column(Text, nullable=True)  # JSON string for any progress-specific data
@@ -30,6 +30,11 @@ class ChallengeProgress(Base):
     # Relationship to Challenge
     challenge = relationship("Challenge", foreign_keys=[challenge_id])
 
+    # One progress row per couple and challenge
+    __table_args__ = (
+        Index("ux_challenge_progress_couple_challenge", "couple_code", "challenge_id", unique=True),
+    )
+
 # Goal Model - Couple-specific goals
 class Goal(Base):
     __tablename__ = "goals"
@@ -42,6 +47,42 @@ class Goal(Base):
     priority = Column(String, nullable=True)  # 'low', 'medium', 'high'
     category = Column(String, nullable=True)  # Custom categorization
     created_by = Column(String, nullable=True)  # Which partner created the goal
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime, nullable=True)
-    couple_code = Column(String, index=True)
+    couple_code = Column(String)
+
+    __table_args__ = (
+        Index("ix_goals_couple_created", "couple_code", "created_at"),
+    )
+
+# CompletionEvent Model - One row per completion that can extend a streak
+# (a challenge completed, a blog entry written, an activity done)
+class CompletionEvent(Base):
+    __tablename__ = "completion_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    couple_code = Column(String, nullable=False)
+    streak = Column(String, nullable=False)  # e.g. 'blog', 'activity', 'challenge:3'
+    occurred_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_completion_events_couple_streak", "couple_code", "streak", "occurred_at"),
+    )
+
+# Streak Model - Running streak per couple, maintained as events come in
+class Streak(Base):
+    __tablename__ = "streaks"
+
+    couple_code = Column(String, primary_key=True)
+    streak = Column(String, primary_key=True)
+    period_days = Column(Integer, nullable=False, default=1)  # 1 = daily, 7 = weekly
+    current = Column(Integer, nullable=False, default=0)
+    longest = Column(Integer, nullable=False, default=0)
+    last_period = Column(Integer, nullable=False, default=0)  # Period number of the latest event
+    expires_at = Column(DateTime, nullable=True)  # When current drops to 0 without a new event
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Only live streaks are indexed, which is all the expiry job looks at
+    __table_args__ = (
+        Index("ix_streaks_live_expires", "expires_at", sqlite_where=text("current > 0")),
+    )
@@ -1,9 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from datetime import datetime
 from .challenge_models import Challenge, ChallengeProgress, Goal
 from . import schemas
+from .pagination import DEFAULT_LIMIT, Page, keyset, to_page
+from .cache import cached
 
 # Challenge CRUD operations
 async def get_all_challenges(db: AsyncSession, active_only: bool = True):
@@ -48,31 +51,34 @@ async def get_couple_challenges(db: AsyncSession, code: str):
     )
     return result.all()
 
-async def start_challenge(db: AsyncSession, challenge_id: int, code: str):
-    # Check if already started
+async def _get_progress(db: AsyncSession, challenge_id: int, code: str):
     result = await db.execute(
         select(ChallengeProgress)
-        .filter(ChallengeProgress.challenge_id == challenge_id)
         .filter(ChallengeProgress.couple_code == code)
+        .filter(ChallengeProgress.challenge_id == challenge_id)
     )
-    existing = result.scalar_one_or_none()
+    return result.scalar_one_or_none()
+
+async def start_challenge(db: AsyncSession, challenge_id: int, code: str):
+    # Check if already started
+    existing = await _get_progress(db, challenge_id, code)
     
     if existing:
         return existing
         
     db_progress = ChallengeProgress(challenge_id=challenge_id, couple_code=code)
     db.add(db_progress)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # The partner started it at the same moment; use their row
+        await db.rollback()
+        return await _get_progress(db, challenge_id, code)
     await db.refresh(db_progress)
     return db_progress
 
 async def complete_challenge(db: AsyncSession, challenge_id: int, code: str, progress_data: str = None):
-    result = await db.execute(
-        select(ChallengeProgress)
-        .filter(ChallengeProgress.challenge_id == challenge_id)
-        .filter(ChallengeProgress.couple_code == code)
-    )
-    db_progress = result.scalar_one_or_none()
+    db_progress = await _get_progress(db, challenge_id, code)
     
     if not db_progress:
         # Auto-start if not started
@@ -83,14 +89,22 @@ async def complete_challenge(db: AsyncSession, challenge_id: int, code: str, pro
     if progress_data:
         db_progress.progress_data = progress_data
     
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Started concurrently by the partner: complete the existing row instead
+        await db.rollback()
+        return await complete_challenge(db, challenge_id, code, progress_data)
     await db.refresh(db_progress)
     return db_progress
 
 # Goal operations
-async def get_couple_goals(db: AsyncSession, code: str):
-    result = await db.execute(select(Goal).filter(Goal.couple_code == code))
-    return result.scalars().all()
+@cached("goals")
+async def get_couple_goals(db: AsyncSession, code: str, limit: int = DEFAULT_LIMIT, cursor: str = None, columns: list = None) -> Page:
+    query = select(*columns) if columns else select(Goal)
+    query = keyset(query.filter(Goal.couple_code == code), Goal.created_at, Goal.id, cursor, limit)
+    result = await db.execute(query)
+    return to_page(result.all() if columns else result.scalars(), limit, "created_at")
 
 async def create_goal(db: AsyncSession, goal: schemas.GoalCreate, code: str, partner_id: str = None):
     goal_data = goal.dict()
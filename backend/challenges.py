@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend.database import get_db
-from backend import schemas
-from backend.challenge_ops import get_challenge, get_couple_challenges, start_challenge, complete_challenge, create_challenge, update_challenge
+from backend import challenge_ops, schemas, serialization
+from backend.challenge_ops import get_challenge, get_couple_challenges
 from .auth import validate_couple_code
 
 router = APIRouter()
@@ -16,17 +16,16 @@ async def get_challenges(
 ):
     """Get all challenges with progress for the current couple"""
     challenges = await get_couple_challenges(db, code)
-    result = []
+    # Build the response dicts straight from the trusted rows, one pass
+    result = serialization.to_dicts([challenge for challenge, _ in challenges], schemas.Challenge)
     
-    for challenge, progress in challenges:
-        challenge_dict = schemas.Challenge.from_orm(challenge).dict()
+    for challenge_dict, (_, progress) in zip(result, challenges):
         challenge_dict["started"] = progress is not None
         challenge_dict["completed"] = progress is not None and progress.completed_at is not None
         challenge_dict["started_at"] = progress.started_at if progress else None
         challenge_dict["completed_at"] = progress.completed_at if progress else None
-        result.append(schemas.ChallengeWithProgress(**challenge_dict))
         
-    return result
+    return serialization.render_json(result)
 
 # Start a challenge for a couple
 @router.post("/{challenge_id}/start", response_model=schemas.ChallengeProgress)
@@ -41,7 +40,7 @@ async def start_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
         
-    progress = await start_challenge(db, challenge_id, code)
+    progress = await challenge_ops.start_challenge(db, challenge_id, code)
     return progress
 
 # Complete a challenge for a couple
@@ -58,7 +57,7 @@ async def complete_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
         
-    progress = await complete_challenge(
+    progress = await challenge_ops.complete_challenge(
         db, 
         challenge_id, 
         code, 
@@ -74,7 +73,7 @@ async def create_challenge(
     # In a real app, add admin validation here
 ):
     """Create a new challenge (admin only)"""
-    return await create_challenge(db, challenge)
+    return await challenge_ops.create_challenge(db, challenge)
 
 @router.put("/admin/{challenge_id}", response_model=schemas.Challenge)
 async def update_challenge(
@@ -84,4 +83,4 @@ async def update_challenge(
     # In a real app, add admin validation here
 ):
     """Update an existing challenge (admin only)"""
-    return await update_challenge(db, challenge_id, challenge)
+    return await challenge_ops.update_challenge(db, challenge_id, challenge)
@@ -0,0 +1,92 @@
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend.models import CollectionVersion
+from backend.cache import note_version, read_cache
+
+# Write hooks shared by every session.
+#
+# Any flush that inserts, updates or deletes a couple-owned row bumps
+# collection_versions for (couple_code, table) in the same transaction.
+# Once the transaction commits, the registered listeners are told which
+# (couple_code, collection) pairs changed.
+
+# Tables whose rows belong to one couple via a couple_code column
+TRACKED = {
+    "activities", "books", "movies", "blog_entries", "photos",
+    "calendar_events", "challenge_progress", "goals",
+}
+
+_listeners = []
+
+def on_commit(fn):
+    """Register fn(couple_code, collection) to run after each committed change."""
+    _listeners.append(fn)
+    return fn
+
+def _touched(session):
+    touched = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        collection = getattr(obj, "__tablename__", None)
+        if collection not in TRACKED:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if obj.couple_code:
+            touched.add((obj.couple_code, collection))
+    return touched
+
+def bump(conn, code: str, collection: str, now: datetime = None):
+    """Advance a couple's collection version, creating it at 1 (sync connection)."""
+    now = now or datetime.utcnow()
+    stmt = insert(CollectionVersion).values(
+        couple_code=code, collection=collection, version=1, updated_at=now
+    )
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[CollectionVersion.couple_code, CollectionVersion.collection],
+        set_={"version": CollectionVersion.version + 1, "updated_at": now},
+    ))
+
+# Keep the in-process read cache coherent with committed writes
+on_commit(read_cache.invalidate)
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions(session, flush_context):
+    touched = _touched(session)
+    if not touched:
+        return
+    now = datetime.utcnow()
+    conn = session.connection(bind_arguments={"writer": True})
+    for code, collection in touched:
+        bump(conn, code, collection, now)
+    session.info.setdefault("touched_collections", set()).update(touched)
+
+@event.listens_for(Session, "after_commit")
+def _notify_listeners(session):
+    for code, collection in session.info.pop("touched_collections", ()):
+        for listener in _listeners:
+            try:
+                listener(code, collection)
+            except Exception as e:
+                print(f"Error in commit listener {listener.__name__}: {str(e)}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("touched_collections", None)
+
+async def get_version(db: AsyncSession, code: str, collection: str):
+    """Return (version, updated_at) for a couple's collection; (0, None) if never written."""
+    result = await db.execute(
+        select(CollectionVersion.version, CollectionVersion.updated_at)
+        .filter(CollectionVersion.couple_code == code)
+        .filter(CollectionVersion.collection == collection)
+    )
+    row = result.first()
+    version, updated_at = (row.version, row.updated_at) if row else (0, None)
+    # Lets cached list queries in the same transaction skip reading it again
+    note_version(db, code, collection, version)
+    return version, updated_at
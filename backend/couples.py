@@ -0,0 +1,151 @@
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend import schemas
+from backend.changes import TRACKED
+from backend.database import AsyncSessionLocal, get_db
+from backend.models import Couple
+
+# Couple registry.
+#
+# Every couple code lives in the couples table, created through
+# POST /couples. The set of known codes is also held in memory, so
+# the validators in backend/auth.py reject an unknown code with a set
+# lookup instead of letting it run empty scans against every table. The
+# set is loaded at startup (on first use, outside the app) and kept
+# current by write hooks on couples. A code missing from it may have just
+# been created by another worker process: it is looked up once by primary
+# key, and the miss is remembered for COUPLE_MISS_TTL seconds so that
+# repeats cost no query.
+
+COUPLE_MISS_TTL = float(os.environ.get("COUPLE_MISS_TTL", "10"))  # seconds
+COUPLE_MISS_CACHE_SIZE = int(os.environ.get("COUPLE_MISS_CACHE_SIZE", "4096"))
+
+# Same shape as the codes the app generates, with some room for older ones
+CODE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{4,32}$")
+CODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+CODE_LENGTH = 6
+
+router = APIRouter(prefix="/couples", tags=["couples"])
+
+class CoupleIndex:
+    def __init__(self, miss_ttl: float = COUPLE_MISS_TTL, max_misses: int = COUPLE_MISS_CACHE_SIZE):
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self._codes = None  # loaded at startup, see main.lifespan
+        self._misses = OrderedDict()  # code -> expires_at
+
+    async def load(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Couple.code))
+            self._codes = set(result.scalars().all())
+        self._misses.clear()
+
+    def add(self, code: str):
+        if self._codes is not None:
+            self._codes.add(code)
+        self._misses.pop(code, None)
+
+    def discard(self, code: str):
+        if self._codes is not None:
+            self._codes.discard(code)
+
+    def known(self, code: str) -> bool:
+        """In the loaded set; never queries, so False may just mean not loaded yet."""
+        return self._codes is not None and code in self._codes
+
+    async def contains(self, code: str) -> bool:
+        if self._codes is None:
+            await self.load()
+        if code in self._codes:
+            return True
+        expires_at = self._misses.get(code)
+        if expires_at is not None and expires_at > time.monotonic():
+            return False
+        # Perhaps created by another worker since this one loaded
+        async with AsyncSessionLocal() as db:
+            found = await db.scalar(select(Couple.code).filter(Couple.code == code))
+        if found is not None:
+            self.add(code)
+            return True
+        self._misses[code] = time.monotonic() + self.miss_ttl
+        self._misses.move_to_end(code)
+        while len(self._misses) > self.max_misses:
+            self._misses.popitem(last=False)
+        return False
+
+index = CoupleIndex()
+
+def generate_code() -> str:
+    return "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+# --- Write hooks ---
+@event.listens_for(Session, "after_flush")
+def _collect_couples(session, flush_context):
+    added = {obj.code for obj in session.new if isinstance(obj, Couple)}
+    removed = {obj.code for obj in session.deleted if isinstance(obj, Couple)}
+    if added or removed:
+        changes = session.info.setdefault("couple_changes", [set(), set()])
+        changes[0].update(added)
+        changes[1].update(removed)
+
+@event.listens_for(Session, "after_commit")
+def _apply_couples(session):
+    added, removed = session.info.pop("couple_changes", (set(), set()))
+    for code in added:
+        index.add(code)
+    for code in removed:
+        index.discard(code)
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("couple_changes", None)
+
+# --- Backfill ---
+def rebuild(conn):
+    """Register every couple code already used by a user or a content row (sync connection)."""
+    sources = " UNION ".join(
+        f"SELECT couple_code FROM {table} WHERE couple_code IS NOT NULL AND couple_code != ''"
+        for table in sorted(TRACKED | {"users"})
+    )
+    conn.execute(
+        text(f"INSERT OR IGNORE INTO couples (code, created_at) SELECT couple_code, :now FROM ({sources})"),
+        {"now": datetime.utcnow()},
+    )
+
+# --- Endpoints ---
+@router.post("", response_model=schemas.Couple, status_code=status.HTTP_201_CREATED)
+async def create_couple(couple: schemas.CoupleCreate, db: AsyncSession = Depends(get_db)):
+    """Register a couple under the given code, or a newly generated one"""
+    if couple.code is not None and not CODE_PATTERN.match(couple.code):
+        raise HTTPException(status_code=400, detail="Couple codes are 4-32 letters, digits, '-' or '_'")
+    for _ in range(5):
+        code = couple.code or generate_code()
+        db_couple = Couple(code=code, created_at=datetime.utcnow())
+        db.add(db_couple)
+        try:
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+            if couple.code:
+                raise HTTPException(status_code=409, detail="Couple code already taken")
+            continue
+        await db.commit()
+        return db_couple
+    raise HTTPException(status_code=503, detail="Could not generate a free couple code")
+
+@router.get("/{code}", response_model=schemas.CoupleCode)
+async def read_couple(code: str):
+    """Whether a couple code exists (404 if not)"""
+    if not await index.contains(code):
+        raise HTTPException(status_code=404, detail="Couple not found")
+    return {"code": code}
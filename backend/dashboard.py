@@ -0,0 +1,134 @@
+import asyncio
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.future import select
+from backend import models, projections, serialization
+from backend.challenge_models import Challenge, ChallengeProgress, Goal
+from backend.challenge_ops import get_couple_goals
+from backend.database import AsyncSessionLocal, READ_POOL_SIZE
+from .auth import validate_couple_code
+
+# Home screen in one round trip. Sections run concurrently, each on its
+# own session from the read pool, but never more at once than
+# DASHBOARD_CONCURRENCY, half the pool by default, so that dashboards never
+# take every read connection from the other endpoints. A section's timeout starts once it holds a connection.
+# One that runs over comes back as null (listed in "timed_out") instead of
+# holding up the rest; its query is left to finish in the background rather
+# than cancelled halfway, and only then gives its connection back.
+
+SECTION_TIMEOUT = float(os.environ.get("DASHBOARD_SECTION_TIMEOUT", "2.0"))  # seconds
+DASHBOARD_CONCURRENCY = int(os.environ.get("DASHBOARD_CONCURRENCY", str(max(1, READ_POOL_SIZE // 2))))
+
+router = APIRouter()
+
+# Shared by all dashboard requests in this process
+_connections = asyncio.Semaphore(DASHBOARD_CONCURRENCY)
+
+COUNTED = {
+    "activities": models.Activity,
+    "books": models.Book,
+    "movies": models.Movie,
+    "blog_entries": models.BlogEntry,
+    "photos": models.Photo,
+    "goals": Goal,
+}
+
+async def _counts(db, code: str, recent: int):
+    counts = {}
+    for name, model in COUNTED.items():
+        result = await db.execute(select(func.count()).select_from(model).filter(model.couple_code == code))
+        counts[name] = result.scalar()
+    return counts
+
+def _recent(fetch, projection):
+    columns = projection.columns(view=projections.View.SUMMARY)
+
+    async def section(db, code: str, recent: int):
+        page = await fetch(db, code, limit=recent, columns=columns)
+        return serialization.to_dicts(page.items)
+    return section
+
+async def _upcoming_events(db, code: str, recent: int):
+    columns = projections.CALENDAR_EVENTS.columns(view=projections.View.SUMMARY)
+    page = await models.get_calendar_events(db, code, start_date=datetime.utcnow(), limit=recent, columns=columns)
+    return serialization.to_dicts(page.items)
+
+async def _challenges_in_progress(db, code: str, recent: int):
+    result = await db.execute(
+        select(Challenge.id, Challenge.title, Challenge.icon, Challenge.points, ChallengeProgress.started_at)
+        .join(ChallengeProgress, ChallengeProgress.challenge_id == Challenge.id)
+        .filter(ChallengeProgress.couple_code == code)
+        .filter(ChallengeProgress.completed_at.is_(None))
+    )
+    return serialization.to_dicts(result.all())
+
+SECTIONS = {
+    "counts": _counts,
+    "recent_activities": _recent(models.get_activities, projections.ACTIVITIES),
+    "recent_books": _recent(models.get_books, projections.BOOKS),
+    "recent_movies": _recent(models.get_movies, projections.MOVIES),
+    "recent_blog_entries": _recent(models.get_blog_entries, projections.BLOG_ENTRIES),
+    "recent_goals": _recent(get_couple_goals, projections.GOALS),
+    "upcoming_events": _upcoming_events,
+    "challenges_in_progress": _challenges_in_progress,
+}
+
+async def _query(section, db, code: str, recent: int):
+    try:
+        return await section(db, code, recent)
+    finally:
+        await db.close()
+        _connections.release()
+
+async def _start(section, code: str, recent: int):
+    """Wait for a connection, then start the section on it."""
+    await _connections.acquire()
+    db = AsyncSessionLocal()
+    try:
+        await db.connection()
+    except BaseException:
+        await db.close()
+        _connections.release()
+        raise
+    return asyncio.ensure_future(_query(section, db, code, recent))
+
+def _finished_late(name: str):
+    def callback(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in dashboard section {name}: {str(task.exception())}")
+    return callback
+
+async def _run(name: str, section, code: str, recent: int, timeout: float):
+    try:
+        task = await _start(section, code, recent)
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            task.add_done_callback(_finished_late(name))
+            return TimeoutError
+        return task.result()
+    except Exception as e:
+        print(f"Error in dashboard section {name}: {str(e)}")
+        return e
+
+@router.get("/dashboard")
+async def get_dashboard(
+    recent: int = Query(5, ge=1, le=20),
+    code: str = Depends(validate_couple_code)
+):
+    """Counts, latest items, upcoming events and in-progress challenges for the home screen"""
+    names = list(SECTIONS)
+    results = await asyncio.gather(
+        *(_run(name, SECTIONS[name], code, recent, SECTION_TIMEOUT) for name in names)
+    )
+    body = {"timed_out": [], "failed": []}
+    for name, result in zip(names, results):
+        if result is TimeoutError:
+            body["timed_out"].append(name)
+            result = None
+        elif isinstance(result, Exception):
+            body["failed"].append(name)
+            result = None
+        body[name] = result
+    return serialization.render_json(body)
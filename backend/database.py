@@ -1,31 +1,104 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.dml import UpdateBase
 
 # Create Base instance for models
 Base = declarative_base()
 
-DATABASE_URL = "sqlite+aiosqlite:///./couple_activities.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./couple_activities.db")
 
+# SQLite tuning, applied to every connection when it is opened.
+# WAL lets readers keep going while the single writer commits.
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable enough under WAL
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-64000"))  # negative = KiB, so ~64MB
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "4"))
+
+def _apply_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    try:
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+# Writer: exactly one connection, so writes queue in the pool instead of
+# fighting over the database lock. aiosqlite defaults to NullPool, which
+# would reopen (and re-tune) a connection for every session.
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Disable SQL logging
-    connect_args={'check_same_thread': False}
+    connect_args={'check_same_thread': False},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=1,
+    max_overflow=0,
+)
+
+# Readers: a small pool of query_only connections.
+read_engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    connect_args={'check_same_thread': False},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=0,
 )
 
+@event.listens_for(engine.sync_engine, "connect")
+def _on_writer_connect(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, read_only=False)
+
+@event.listens_for(read_engine.sync_engine, "connect")
+def _on_reader_connect(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, read_only=True)
+
+class RoutingSession(Session):
+    """Send SELECTs to the read pool and flushes/DML to the writer.
+
+    Once a transaction has written anything it sticks to the writer, so it
+    keeps seeing its own uncommitted changes. Pass
+    ``bind_arguments={"writer": True}`` to force the writer for raw SQL.
+    """
+
+    def get_bind(self, mapper=None, clause=None, writer=False, **kw):
+        if writer or self._flushing or isinstance(clause, UpdateBase):
+            self.info["uses_writer"] = True
+        if self.info.get("uses_writer"):
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("uses_writer", None)
+
 AsyncSessionLocal = sessionmaker(
-    engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autoflush=False  # Disable autoflush for better performance
 )
 
 async def init_db():
-    async with engine.begin() as conn:
-        # COMMENTED OUT: Drop all tables to start fresh (ONE TIME ONLY)
-        # await conn.run_sync(Base.metadata.drop_all)
-        # Create all tables if they don't exist
-        await conn.run_sync(Base.metadata.create_all)
+    # Bring the schema up to date; a no-op version check when nothing is pending
+    from backend.migrations import migrate
+    return await migrate()
+
+async def dispose_engines():
+    await read_engine.dispose()
+    await engine.dispose()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
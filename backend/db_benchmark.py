@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Mixed read/write benchmark for the engine layer (backend/database.py).
+# A crowd of readers lists a couple's activities while a few writers add
+# them, first through a plain engine (default journal, new connection per
+# session), then through the app's sessions (WAL, read pool, one writer),
+# each on its own scratch database. Counts completed reads and writes and
+# any errors, such as "database is locked".
+#
+#   python -m backend.db_benchmark [readers] [writers] [seconds]
+
+SCRATCH = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{SCRATCH}/tuned.db"
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from backend.database import AsyncSessionLocal, Base, dispose_engines, init_db
+from backend.models import Activity
+
+CODE = "BENCH1"
+SEED_ROWS = 1000
+
+def activity(i: int) -> Activity:
+    return Activity(
+        title=f"Activity {i}", description="x" * 200, status="planned", category="outdoor",
+        difficulty="easy", duration=60, cost="free", couple_code=CODE,
+    )
+
+async def seed(Session):
+    async with Session() as db:
+        db.add_all(activity(i) for i in range(SEED_ROWS))
+        await db.commit()
+
+async def read(Session, until, counts):
+    while time.perf_counter() < until:
+        try:
+            async with Session() as db:
+                result = await db.execute(
+                    select(Activity).filter(Activity.couple_code == CODE)
+                    .order_by(Activity.created_at.desc()).limit(50)
+                )
+                result.scalars().all()
+            counts["reads"] += 1
+        except Exception as e:
+            counts["errors"] += 1
+            counts["last_error"] = str(e)
+
+async def write(Session, until, counts):
+    while time.perf_counter() < until:
+        try:
+            async with Session() as db:
+                db.add(activity(counts["writes"]))
+                await db.commit()
+            counts["writes"] += 1
+        except Exception as e:
+            counts["errors"] += 1
+            counts["last_error"] = str(e)
+
+async def measure(label: str, Session, readers: int, writers: int, seconds: float):
+    await seed(Session)
+    counts = {"reads": 0, "writes": 0, "errors": 0, "last_error": None}
+    until = time.perf_counter() + seconds
+    await asyncio.gather(
+        *(read(Session, until, counts) for _ in range(readers)),
+        *(write(Session, until, counts) for _ in range(writers)),
+    )
+    print(f"{label:<28} {counts['reads'] / seconds:8.0f} reads/s {counts['writes'] / seconds:8.0f} writes/s"
+          f"   {counts['errors']} errors")
+    if counts["last_error"]:
+        print(f"{'':<28} last error: {counts['last_error']}")
+
+async def run(readers: int, writers: int, seconds: float):
+    plain = create_async_engine(f"sqlite+aiosqlite:///{SCRATCH}/plain.db", connect_args={'check_same_thread': False})
+    try:
+        async with plain.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        PlainSession = sessionmaker(plain, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+        await measure("plain engine", PlainSession, readers, writers, seconds)
+    finally:
+        await plain.dispose()
+    await init_db()
+    try:
+        await measure("WAL + read pool + writer", AsyncSessionLocal, readers, writers, seconds)
+    finally:
+        await dispose_engines()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(run(
+        int(args[0]) if args else 16,
+        int(args[1]) if len(args) > 1 else 4,
+        float(args[2]) if len(args) > 2 else 3,
+    ))
@@ -0,0 +1,54 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import changes
+
+# Conditional GETs for list endpoints. The ETag is derived from the
+# couple's collection version plus the query string, so checking it costs
+# one primary-key lookup in collection_versions and no row-table reads.
+
+def make_etag(collection: str, code: str, version: int, variant: str = "") -> str:
+    digest = hashlib.sha1(f"{collection}|{code}|{variant}".encode()).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def http_date(moment: datetime) -> str:
+    # Stored times are naive UTC
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+def unmodified_since(request: Request, last_modified: datetime) -> bool:
+    # If-None-Match takes precedence when both are sent
+    header = request.headers.get("if-modified-since")
+    if not header or request.headers.get("if-none-match"):
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **(headers or {})})
+
+async def check(request: Request, response: Response, db: AsyncSession, code: str, collection: str) -> Optional[Response]:
+    """Return a 304 response if the client's copy is current, else set ETag on response."""
+    version, _ = await changes.get_version(db, code, collection)
+    etag = make_etag(collection, code, version, request.url.query)
+    if matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return None
@@ -0,0 +1,153 @@
+import os
+import re
+import stat
+from datetime import datetime
+from mimetypes import guess_type
+from typing import Optional
+import anyio
+from fastapi import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from backend import etags
+
+# File responses for uploaded photos.
+#
+# Compared with Starlette's FileResponse this adds strong ETags, 304s for
+# If-None-Match / If-Modified-Since, single byte-range requests (with
+# If-Range), long-lived immutable caching for content-addressed names,
+# and zero-copy sending through the ASGI "http.response.zerocopysend"
+# extension when the server offers it. The stat is done once, off the
+# event loop, by the caller (see stat_file) and reused for every header.
+
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY = "http.response.zerocopysend"
+
+# {sha256}{extension}, plus any variant suffix (see backend/blobs.py)
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})(\.[\w.]+)?$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+async def stat_file(path: str) -> Optional[os.stat_result]:
+    """stat() in the thread pool; None unless path is a regular file."""
+    try:
+        result = await anyio.to_thread.run_sync(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
+
+def file_etag(name: str, stat_result: os.stat_result) -> str:
+    match = CONTENT_ADDRESSED.match(name)
+    if match and (match.group(2) or "").count(".") <= 1:
+        # An original, whose name is the hash of its bytes
+        return f'"{match.group(1)}"'
+    # Files are only ever replaced whole (os.replace), which moves mtime
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def parse_range(header: str, size: int):
+    """(start, end) inclusive for a single satisfiable range; None to send it all; False if unsatisfiable."""
+    match = RANGE.match(header.strip())
+    if not match or size == 0:
+        # Multiple ranges or other units: the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+class PhotoFileResponse(Response):
+    def __init__(self, path: str, stat_result: os.stat_result, request: Request, name: str = None, cache_control: str = None):
+        self.path = path
+        self.size = stat_result.st_size
+        self.send_header_only = request.method == "HEAD"
+        self.range = None
+        name = name or os.path.basename(path)
+        etag = file_etag(name, stat_result)
+        last_modified = datetime.utcfromtimestamp(int(stat_result.st_mtime))
+        headers = {
+            "ETag": etag,
+            "Last-Modified": etags.http_date(last_modified),
+            "Accept-Ranges": "bytes",
+            "Cache-Control": cache_control or (IMMUTABLE if CONTENT_ADDRESSED.match(name) else REVALIDATE),
+        }
+        self.media_type = guess_type(name)[0] or "application/octet-stream"
+        self.background = None
+
+        if etags.matches(request, etag) or etags.unmodified_since(request, last_modified):
+            self.status_code = 304
+            self.init_headers(headers)
+            self.size = 0
+            self.send_header_only = True
+            return
+
+        self.status_code = 200
+        requested = request.headers.get("range")
+        if requested and self._if_range(request, etag, last_modified):
+            byte_range = parse_range(requested, self.size)
+            if byte_range is False:
+                self.status_code = 416
+                headers["Content-Range"] = f"bytes */{self.size}"
+                self.size = 0
+                self.send_header_only = True
+            elif byte_range is not None:
+                self.status_code = 206
+                self.range = byte_range
+                headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{self.size}"
+        headers["Content-Length"] = str(self.length)
+        self.init_headers(headers)
+
+    @staticmethod
+    def _if_range(request: Request, etag: str, last_modified: datetime) -> bool:
+        # A stale If-Range means the client's partial copy is of another
+        # version: send the whole new one instead of a piece of it
+        condition = request.headers.get("if-range")
+        if not condition:
+            return True
+        if condition.startswith('"') or condition.startswith("W/"):
+            return condition == etag
+        return etags.http_date(last_modified) == condition
+
+    @property
+    def offset(self) -> int:
+        return self.range[0] if self.range else 0
+
+    @property
+    def length(self) -> int:
+        return self.range[1] - self.range[0] + 1 if self.range else self.size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if ZEROCOPY in scope.get("extensions", {}):
+            # The server sends straight from the file descriptor (sendfile)
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send({"type": ZEROCOPY, "file": file, "offset": self.offset, "count": self.length})
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset)
+            remaining = self.length
+            while remaining:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    # Truncated under us; end the body rather than hang
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+            if remaining:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend.database import get_db
-from backend import schemas
+from backend import schemas, pagination, projections, etags, serialization
 from backend.challenge_ops import get_couple_goals, create_goal, update_goal, delete_goal
 from .auth import validate_couple_code
 
@@ -10,11 +10,23 @@ router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Goal])
 async def get_goals(
+    request: Request,
+    response: Response,
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None,
     code: str = Depends(validate_couple_code),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all goals for a couple"""
-    return await get_couple_goals(db, code)
+    """Get a page of goals for a couple, newest first"""
+    unchanged = await etags.check(request, response, db, code, "goals")
+    if unchanged:
+        return unchanged
+    columns = projections.GOALS.columns(fields, view)
+    page = await get_couple_goals(db, code, limit, cursor, columns)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, None if columns else schemas.Goal, response)
 
 @router.post("/", response_model=schemas.Goal, status_code=status.HTTP_201_CREATED)
 async def create_goal(
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from sqlalchemy import or_, tuple_
+from sqlalchemy.future import select
+from backend.database import AsyncSessionLocal
+from backend.models import CalendarEvent
+from backend.recurrence import rrule
+
+# iCalendar (RFC 5545) rendering of a couple's calendar.
+#
+# The feed is written one VEVENT at a time while events are read in
+# (start_time, id) pages from ix_calendar_events_couple_start, so memory
+# stays flat however long the calendar is. The output depends only on
+# the stored events and the collection's updated_at (used as DTSTAMP),
+# which makes it byte-for-byte stable between writes and lets the
+# collection version serve as a strong ETag.
+
+FEED_BATCH = 500  # events read per query
+LINE_LIMIT = 75  # octets per content line before folding
+PRODID = "-//Couple Activities//Calendar Feed//EN"
+
+COLUMNS = (
+    CalendarEvent.id, CalendarEvent.title, CalendarEvent.description, CalendarEvent.location,
+    CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.all_day,
+    CalendarEvent.recurrence, CalendarEvent.reminder, CalendarEvent.event_type,
+)
+
+def escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+    )
+
+def fold(line: str) -> str:
+    """Split a content line into CRLF-terminated chunks of at most LINE_LIMIT octets."""
+    data = line.encode()
+    if len(data) <= LINE_LIMIT:
+        return line + "\r\n"
+    chunks = []
+    limit = LINE_LIMIT
+    while data:
+        cut = min(limit, len(data))
+        # Never split inside a UTF-8 sequence
+        while cut < len(data) and data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(data[:cut].decode())
+        data = data[cut:]
+        limit = LINE_LIMIT - 1  # continuation lines start with a space
+    return "\r\n ".join(chunks) + "\r\n"
+
+def utc(moment: datetime) -> str:
+    # Times are stored as naive UTC
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+def vevent(row, stamp: datetime) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:calendar-event-{row.id}@couple-activities",
+        f"DTSTAMP:{utc(stamp)}",
+    ]
+    if row.all_day:
+        last_day = (row.end_time or row.start_time).date()
+        lines.append(f"DTSTART;VALUE=DATE:{row.start_time:%Y%m%d}")
+        # DTEND is exclusive for dates
+        lines.append(f"DTEND;VALUE=DATE:{max(last_day, row.start_time.date()) + timedelta(days=1):%Y%m%d}")
+    else:
+        lines.append(f"DTSTART:{utc(row.start_time)}")
+        if row.end_time is not None and row.end_time >= row.start_time:
+            lines.append(f"DTEND:{utc(row.end_time)}")
+    rule = rrule(row.start_time, row.recurrence)
+    if rule:
+        lines.append(f"RRULE:{rule}")
+    lines.append(f"SUMMARY:{escape(row.title)}")
+    if row.description:
+        lines.append(f"DESCRIPTION:{escape(row.description)}")
+    if row.location:
+        lines.append(f"LOCATION:{escape(row.location)}")
+    if row.event_type:
+        lines.append(f"CATEGORIES:{escape(row.event_type)}")
+    if row.reminder is not None:
+        lines += [
+            "BEGIN:VALARM", "ACTION:DISPLAY", f"DESCRIPTION:{escape(row.title)}",
+            f"TRIGGER:-PT{row.reminder}M", "END:VALARM",
+        ]
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+async def feed(code: str, stamp: datetime):
+    """Yield the couple's shared events as an iCalendar document, in chunks."""
+    yield "".join(fold(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+    ))
+    after = None
+    while True:
+        # A session per page, closed before the page is yielded, so the
+        # feed holds a read connection only while it queries, never while
+        # the client is slow to read
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(*COLUMNS)
+                .filter(CalendarEvent.couple_code == code)
+                # Events kept private by their creator stay out of the shared feed
+                .filter(or_(CalendarEvent.shared.is_(None), CalendarEvent.shared.is_(True)))
+            )
+            if after:
+                query = query.filter(tuple_(CalendarEvent.start_time, CalendarEvent.id) > tuple_(*after))
+            query = query.order_by(CalendarEvent.start_time, CalendarEvent.id).limit(FEED_BATCH)
+            rows = (await db.execute(query)).all()
+        if rows:
+            yield "".join(vevent(row, stamp) for row in rows)
+        if len(rows) < FEED_BATCH:
+            break
+        after = (rows[-1].start_time, rows[-1].id)
+    yield fold("END:VCALENDAR")
@@ -0,0 +1,37 @@
+import os
+from PIL import Image, ImageOps
+
+# Image resizing, run inside the thumbnail process pool.
+#
+# Kept free of the app's database and web imports so that pool workers
+# start quickly and hold nothing but Pillow.
+
+# Variant name -> longest edge in pixels
+SIZES = {"thumb": 256, "small": 640, "medium": 1280}
+
+FORMAT = "WEBP"
+EXTENSION = "webp"
+QUALITY = 80
+
+def render(source: str, dest: str, max_edge: int):
+    """Write source scaled to fit max_edge as WebP at dest; returns (width, height, bytes)."""
+    with Image.open(source) as image:
+        # Phones store rotation in EXIF; apply it, since the output drops EXIF
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        partial = f"{dest}.{os.getpid()}.part"
+        try:
+            image.save(partial, FORMAT, quality=QUALITY, method=4)
+            os.replace(partial, dest)
+        except BaseException:
+            if os.path.exists(partial):
+                os.unlink(partial)
+            raise
+        return image.width, image.height, os.path.getsize(dest)
+
+def describe(path: str):
+    """(width, height, bytes) of an already rendered variant."""
+    with Image.open(path) as image:
+        return image.width, image.height, os.path.getsize(path)
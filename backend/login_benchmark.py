@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Login-storm benchmark: measures the latency of an unrelated, trivial
+# endpoint (GET /) on its own and while a crowd of clients keeps logging
+# in, all in one process against a scratch database. With password
+# hashing on the event loop every bcrypt call stalls the probe; with it
+# on the password executor the probe should barely notice the storm.
+#
+#   python -m backend.login_benchmark [concurrent logins] [seconds]
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/login_benchmark.db"
+# Measures the event loop, not the per-client limits (backend/ratelimit.py)
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+import httpx
+from backend.database import init_db, dispose_engines
+from backend.main import app
+
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery staple"
+PROBE_INTERVAL = 0.01  # seconds
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def probe(client, until):
+    # Requests go out on a fixed schedule and are timed from when they
+    # were due, so time spent waiting for a stalled loop counts too
+    latencies = []
+    due = time.perf_counter()
+    while due < until:
+        await asyncio.sleep(max(0, due - time.perf_counter()))
+        await client.get("/")
+        latencies.append((time.perf_counter() - due) * 1000)
+        due += PROBE_INTERVAL
+    return latencies
+
+async def log_in(client, until):
+    count = 0
+    while time.perf_counter() < until:
+        response = await client.post("/user/login", data={"username": EMAIL, "password": PASSWORD})
+        count += response.status_code == 200
+    return count
+
+def report(label, latencies):
+    print(f"{label:<20} p50 {percentile(latencies, 0.5):8.1f} ms   "
+          f"p99 {percentile(latencies, 0.99):8.1f} ms   max {max(latencies):8.1f} ms   ({len(latencies)} requests)")
+
+async def run(logins: int, seconds: float):
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            await client.post("/user/register", json={"email": EMAIL, "password": PASSWORD, "display_name": "Storm"})
+            report("GET / (idle)", await probe(client, time.perf_counter() + seconds))
+            until = time.perf_counter() + seconds
+            latencies, *counts = await asyncio.gather(
+                probe(client, until), *(log_in(client, until) for _ in range(logins))
+            )
+            report(f"GET / ({logins} logins)", latencies)
+            print(f"{'logins':<20} {sum(counts)} in {seconds:.0f} s")
+    finally:
+        await dispose_engines()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(run(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 5))
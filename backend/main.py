@@ -1,10 +1,18 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend import models
 from backend import schemas
-from backend.database import engine, get_db, init_db, Base, AsyncSessionLocal
+from backend import pagination, projections, etags, serialization
+from backend import badges, couples, passwords, reminders, suggestions, thumbnails
+from backend.auth import validate_code_param
+from backend.cache import read_cache
+from backend.token_cache import token_cache
+from backend.ratelimit import RateLimitMiddleware, limiter
+from backend.database import get_db, init_db, dispose_engines, AsyncSessionLocal
 from backend.books import router as books_router
 from backend.movies import router as movies_router
 from backend.blog import router as blog_router
@@ -13,14 +21,55 @@ from backend.calendar import router as calendar_router
 from backend.challenges import router as challenges_router
 from backend.goals import router as goals_router
 from backend.user_auth import router as user_auth_router
+from backend.dashboard import router as dashboard_router
+from backend.streaks import router as streaks_router, run_expiry
+from backend.search import router as search_router
+from backend.couples import router as couples_router
 
-# Import our custom models to ensure they're included in create_all
+# Import our custom models so they're registered on Base.metadata
 from backend.challenge_models import Challenge, ChallengeProgress, Goal
 
 # Import seed data function
 from backend.seed_challenges import seed_challenges
 
-app = FastAPI()
+# Initialize database and seed data on startup, start the background jobs,
+# and stop them again on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Apply pending schema migrations (just a version check when up to date)
+    version = await init_db()
+    # Load the couple registry now rather than on the first request, which
+    # may already be holding a read connection of its own
+    await couples.index.load()
+    
+    # Get a DB session
+    async with AsyncSessionLocal() as session:
+        try:
+            # Seed challenges
+            await seed_challenges(session)
+            print(f"✓ Database initialized (schema v{version}) and challenges seeded")
+        except Exception as e:
+            print(f"Error during seeding: {e}")
+            # Continue app startup even if seeding fails
+
+    # Close out lapsed streaks for every couple periodically
+    jobs = [asyncio.create_task(run_expiry())]
+    # Deliver calendar reminders as they come due
+    if reminders.REMINDERS_ENABLED:
+        jobs.append(asyncio.create_task(reminders.scheduler.run()))
+    yield
+    for job in jobs:
+        job.cancel()
+    await asyncio.gather(*jobs, return_exceptions=True)
+    thumbnails.shutdown()
+    passwords.shutdown()
+    await dispose_engines()
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-client token buckets and a cap on concurrent writes; added first so
+# that CORS wraps it and 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 
 # Configure CORS (must be before routers)
 app.add_middleware(
@@ -29,10 +78,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # "*" is ignored for credentialed requests, so name the ones clients read
+    expose_headers=["*", "X-Next-Cursor", "X-Limit", "ETag", "Retry-After"]
 )
 
-# Register routers for books, movies, blog, photos, calendar, challenges, goals
+# Register routers for books, movies, blog, photos, calendar, challenges, goals, dashboard, streaks, search
 app.include_router(books_router)
 app.include_router(movies_router)
 app.include_router(blog_router)
@@ -41,54 +91,48 @@ app.include_router(calendar_router, prefix="/calendar", tags=["calendar"])
 app.include_router(challenges_router, prefix="/challenges", tags=["challenges"])
 app.include_router(goals_router, prefix="/goals", tags=["goals"])
 app.include_router(user_auth_router)
+app.include_router(dashboard_router, tags=["dashboard"])
+app.include_router(streaks_router, tags=["streaks"])
+app.include_router(search_router, tags=["search"])
+app.include_router(couples_router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Couple Activities API"}
 
-# Initialize database and seed data on startup
-@app.on_event("startup")
-async def startup_event():
-    # Create database tables if they don't exist (don't drop existing tables)
-    async with engine.begin() as conn:
-        # Create all tables if they don't exist (without dropping existing ones)
-        await conn.run_sync(Base.metadata.create_all)
-    
-    # Get a DB session
-    async with AsyncSessionLocal() as session:
-        try:
-            # Seed challenges
-            await seed_challenges(session)
-            print("✓ Database initialized and challenges seeded")
-        except Exception as e:
-            print(f"Error during seeding: {e}")
-            # Continue app startup even if seeding fails
-
 @app.get("/activities/", response_model=List[schemas.Activity])
 async def get_activities(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None,
+    code: str = Depends(validate_code_param),
     category: Optional[schemas.Category] = None,
     difficulty: Optional[schemas.Difficulty] = None,
     cost: Optional[schemas.Cost] = None,
-    season: Optional[schemas.Season] = None
+    season: Optional[schemas.Season] = None,
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None
 ):
     try:
-        if not code:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Couple code is required"
-            )
-
-        activities = await models.get_activities(
+        unchanged = await etags.check(request, response, db, code, "activities")
+        if unchanged:
+            return unchanged
+        columns = projections.ACTIVITIES.columns(fields, view)
+        page = await models.get_activities(
             db=db,
             code=code,
             category=category,
             difficulty=difficulty,
             cost=cost,
-            season=season
+            season=season,
+            limit=limit,
+            cursor=cursor,
+            columns=columns
         )
-        return activities
+        pagination.set_page_headers(response, page, limit)
+        return serialization.render_list(page.items, None if columns else schemas.Activity, response)
     except HTTPException:
         raise
     except Exception as e:
@@ -102,15 +146,9 @@ async def get_activities(
 async def create_activity(
     activity: schemas.ActivityCreate,
     db: AsyncSession = Depends(get_db),
-    code: str = None
+    code: str = Depends(validate_code_param)
 ):
     try:
-        if not code:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Couple code is required"
-            )
-
         return await models.create_activity(db=db, activity=activity, code=code)
     except HTTPException:
         raise
@@ -137,10 +175,33 @@ async def get_costs():
 async def get_seasons():
     return [season.value for season in schemas.Season]
 
-@app.get("/badges/", response_model=List[str])
-async def get_badges(code: str, db: AsyncSession = Depends(get_db)):
-    return models.calculate_badges(db, code)
+@app.get("/activities/suggest", response_model=schemas.Activity)
+async def suggest_activity(
+    code: str = Depends(validate_code_param),
+    category: Optional[schemas.Category] = None,
+    difficulty: Optional[schemas.Difficulty] = None,
+    cost: Optional[schemas.Cost] = None,
+    season: Optional[schemas.Season] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Suggest a planned activity ranked against the couple's past ratings"""
+    activity = await suggestions.suggest_activity(db, code, category, difficulty, cost, season)
+    if activity is None:
+        raise HTTPException(status_code=404, detail="No activities to suggest")
+    return activity
+
+@app.get("/metrics/cache")
+async def get_cache_stats():
+    return read_cache.stats()
 
-@app.on_event("startup")
-async def startup():
-    await init_db()
+@app.get("/metrics/tokens")
+async def get_token_cache_stats():
+    return token_cache.stats()
+
+@app.get("/metrics/ratelimit")
+async def get_rate_limit_stats():
+    return limiter.stats()
+
+@app.get("/badges/", response_model=List[str])
+async def get_badges(code: str = Depends(validate_code_param), db: AsyncSession = Depends(get_db)):
+    return await badges.calculate_badges(db, code)
@@ -0,0 +1,219 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import text
+from backend.database import Base, engine
+
+# Import every model module so Base.metadata knows all tables
+from backend import models  # noqa: F401
+from backend import challenge_models  # noqa: F401
+from backend import badges, blobs, couples, recurrence, reminders, search, streaks
+
+# Ordered list of (version, description, fn). Each fn receives a sync
+# connection inside the migration transaction and must be safe to run
+# against a database that create_all already brought up to date, since
+# older installs were created that way.
+MIGRATIONS = []
+
+def migration(version: int, description: str):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+def latest_version() -> int:
+    return max(version for version, _, _ in MIGRATIONS)
+
+# --- Helpers ---
+def create_tables(conn, *names):
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[name] for name in names])
+
+def column_names(conn, table: str):
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+def add_column(conn, table: str, column: str, ddl: str):
+    if column not in column_names(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def create_indexes(conn, *tables):
+    # Creates whatever indexes the models declare that are not there yet
+    for name in tables:
+        for index in Base.metadata.tables[name].indexes:
+            index.create(conn, checkfirst=True)
+
+def drop_index(conn, name: str):
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+AFTER_COMMIT = "migration_after_commit"
+
+# Columns the list endpoints page by (see backend/pagination.py)
+SORT_COLUMNS = [
+    ("activities", "created_at"), ("books", "created_at"), ("movies", "created_at"),
+    ("blog_entries", "created_at"), ("photos", "uploaded_at"), ("goals", "created_at"),
+]
+# Spelled the way SQLAlchemy stores DateTime, so it compares with its binds
+EPOCH = "1970-01-01 00:00:00.000000"
+
+def after_commit(conn, fn):
+    """Run fn() once every pending migration has committed; dropped if any of it rolls back."""
+    conn.info.setdefault(AFTER_COMMIT, []).append(fn)
+
+# --- Migrations ---
+@migration(1, "Baseline schema")
+def _baseline(conn):
+    create_tables(
+        conn,
+        "users", "activities", "books", "movies", "blog_entries", "photos",
+        "calendar_events", "challenges", "challenge_progress", "goals",
+    )
+
+@migration(2, "Add activities.mood and blog_entries.mood")
+def _mood(conn):
+    # Databases created before the mood fields were added are missing them
+    add_column(conn, "activities", "mood", "VARCHAR")
+    add_column(conn, "blog_entries", "mood", "VARCHAR")
+
+@migration(3, "Composite couple-scoped indexes")
+def _couple_indexes(conn):
+    # Keep one progress row per (couple, challenge) before the unique
+    # index goes on, preferring a completed row over an in-progress one
+    conn.execute(text(
+        "DELETE FROM challenge_progress WHERE id NOT IN ("
+        " SELECT id FROM ("
+        "  SELECT id, ROW_NUMBER() OVER ("
+        "   PARTITION BY couple_code, challenge_id"
+        "   ORDER BY completed_at IS NULL, id) AS rn"
+        "  FROM challenge_progress)"
+        " WHERE rn = 1)"
+    ))
+    # The composites below start with couple_code, so these are redundant
+    for name in (
+        "ix_activities_couple_code", "ix_photos_couple_code",
+        "ix_calendar_events_couple_code", "ix_challenge_progress_couple_code",
+    ):
+        drop_index(conn, name)
+    create_indexes(conn, "activities", "photos", "calendar_events", "challenge_progress")
+
+@migration(4, "Keyset pagination indexes")
+def _pagination_indexes(conn):
+    # Filter indexes gain the sort column so filtered pages need no sort step
+    for name in (
+        "ix_activities_couple_category", "ix_activities_couple_difficulty",
+        "ix_activities_couple_cost", "ix_activities_couple_season",
+        "ix_photos_couple_activity", "ix_photos_couple_blog_entry",
+        "ix_books_couple_code", "ix_movies_couple_code",
+        "ix_blog_entries_couple_code", "ix_goals_couple_code",
+    ):
+        drop_index(conn, name)
+    create_indexes(conn, "activities", "books", "movies", "blog_entries", "photos", "goals")
+
+@migration(5, "Per-couple collection versions")
+def _collection_versions(conn):
+    create_tables(conn, "collection_versions")
+
+@migration(6, "Badge counters")
+def _badge_counters(conn):
+    create_tables(conn, "couple_counters")
+    # From here on the write hooks keep them current
+    badges.rebuild(conn)
+
+@migration(7, "Completion events and streaks")
+def _streaks(conn):
+    create_tables(conn, "completion_events", "streaks")
+    streaks.rebuild(conn)
+
+@migration(8, "Full-text search index")
+def _search_index(conn):
+    search.create(conn)
+    search.rebuild(conn)
+
+@migration(9, "Calendar span index")
+def _calendar_spans(conn):
+    recurrence.create(conn)
+    recurrence.rebuild(conn)
+
+@migration(10, "Add calendar_events.remind_at")
+def _remind_at(conn):
+    add_column(conn, "calendar_events", "remind_at", "DATETIME")
+    create_indexes(conn, "calendar_events")
+    reminders.rebuild(conn)
+
+@migration(11, "Add photos.checksum")
+def _photo_checksum(conn):
+    add_column(conn, "photos", "checksum", "VARCHAR")
+
+@migration(12, "Photo variants")
+def _photo_variants(conn):
+    create_tables(conn, "photo_variants")
+    create_indexes(conn, "photos")
+
+@migration(13, "Content-addressed photo blobs")
+def _photo_blobs(conn):
+    create_tables(conn, "photo_blobs")
+    create_indexes(conn, "photos")
+    # Hashes every stored photo and merges identical files into one blob.
+    # Renamed originals stay on disk until the new paths are committed.
+    retired = blobs.dedupe(conn)
+    after_commit(conn, lambda: blobs.discard_retired(retired))
+
+@migration(14, "Couple registry")
+def _couples(conn):
+    create_tables(conn, "couples")
+    # Every code already in use becomes a registered couple
+    couples.rebuild(conn)
+
+@migration(15, "Backfill list sort columns")
+def _sort_columns(conn):
+    # Keyset cursors compare (sort column, id); a NULL sort value never
+    # compares, so such rows were skipped or broke the page. Give them the
+    # oldest possible time, which keeps them where NULLs sorted before.
+    for table, column in SORT_COLUMNS:
+        result = conn.execute(text(f"UPDATE {table} SET {column} = :epoch WHERE {column} IS NULL"), {"epoch": EPOCH})
+        if result.rowcount:
+            conn.execute(
+                text("UPDATE collection_versions SET version = version + 1 WHERE collection = :table"),
+                {"table": table},
+            )
+
+# --- Runner ---
+def _current_version(conn) -> int:
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except Exception:
+        # Table does not exist yet: nothing has been applied
+        return 0
+
+def upgrade(conn) -> int:
+    current = _current_version(conn)
+    if current >= latest_version():
+        return current
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR, applied_at DATETIME)"
+    ))
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        print(f"Applying migration {version}: {description}")
+        fn(conn)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+            {"v": version, "d": description, "t": datetime.utcnow()},
+        )
+        current = version
+    return current
+
+async def migrate() -> int:
+    """Apply pending migrations in one transaction and return the schema version."""
+    async with engine.begin() as conn:
+        try:
+            version = await conn.run_sync(upgrade)
+        finally:
+            # Only steps of a migration run that goes on to commit are kept
+            pending = conn.sync_connection.info.pop(AFTER_COMMIT, [])
+    for fn in pending:
+        fn()
+    return version
+
+if __name__ == "__main__":
+    print(f"✓ Database at schema version {asyncio.run(migrate())}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,6 +6,8 @@ from sqlalchemy.future import select
 from fastapi import HTTPException
 from backend import schemas
 from backend.database import Base
+from backend.pagination import DEFAULT_LIMIT, Page, keyset, to_page
+from backend.cache import cached
 
 class User(Base):
     __tablename__ = "users"
@@ -14,10 +16,14 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     display_name = Column(String, nullable=True)
     profile_pic = Column(String, nullable=True)  # File path or URL
-    couple_code = Column(String, index=True, nullable=True)
+    couple_code = Column(String, ForeignKey("couples.code"), index=True, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-
+class Couple(Base):
+    __tablename__ = "couples"
+    # The code partners share; content rows refer to it as couple_code
+    code = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Activity(Base):
     __tablename__ = "activities"
@@ -32,11 +38,20 @@ class Activity(Base):
     cost = Column(String)  # "free", "low", "medium", "high"
     season = Column(String, nullable=True)  # "spring", "summer", "fall", "winter", null for any season
     mood = Column(String, nullable=True)  # Emoji or text mood
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime, nullable=True)
     rating = Column(Integer, nullable=True)  # Rating after completion (1-5)
     notes = Column(Text, nullable=True)  # Notes after completing the activity
-    couple_code = Column(String, index=True)
+    couple_code = Column(String)
+
+    # List filters are couple_code plus at most one attribute, newest first
+    __table_args__ = (
+        Index("ix_activities_couple_created", "couple_code", "created_at"),
+        Index("ix_activities_couple_category", "couple_code", "category", "created_at"),
+        Index("ix_activities_couple_difficulty", "couple_code", "difficulty", "created_at"),
+        Index("ix_activities_couple_cost", "couple_code", "cost", "created_at"),
+        Index("ix_activities_couple_season", "couple_code", "season", "created_at"),
+    )
 
 class Book(Base):
     __tablename__ = "books"
@@ -47,8 +62,13 @@ class Book(Base):
     status = Column(String)  # "to_read", "reading", "completed"
     rating = Column(Integer, nullable=True)  # 1-5 stars
     review = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    couple_code = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    couple_code = Column(String)
+
+    # Keyset pagination walks (couple_code, created_at, id); id is the rowid
+    __table_args__ = (
+        Index("ix_books_couple_created", "couple_code", "created_at"),
+    )
 
 class Movie(Base):
     __tablename__ = "movies"
@@ -60,8 +80,12 @@ class Movie(Base):
     status = Column(String)  # "to_watch", "watched"
     rating = Column(Integer, nullable=True)  # 1-5 stars
     review = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    couple_code = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    couple_code = Column(String)
+
+    __table_args__ = (
+        Index("ix_movies_couple_created", "couple_code", "created_at"),
+    )
 
 class BlogEntry(Base):
     __tablename__ = "blog_entries"
@@ -70,8 +94,12 @@ class BlogEntry(Base):
     title = Column(String, index=True)
     content = Column(Text)
     mood = Column(String, nullable=True)  # Emoji or text mood
-    created_at = Column(DateTime, default=datetime.utcnow)
-    couple_code = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    couple_code = Column(String)
+
+    __table_args__ = (
+        Index("ix_blog_entries_couple_created", "couple_code", "created_at"),
+    )
 
 
 
@@ -82,25 +110,95 @@ class Photo(Base):
     file_path = Column(String, nullable=False)
     activity_id = Column(Integer, nullable=True)
     blog_entry_id = Column(Integer, nullable=True)
-    couple_code = Column(String, index=True)
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    couple_code = Column(String)
+    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    checksum = Column(String, nullable=True)  # SHA-256 of the file, hex; the photo_blobs key
+
+    __table_args__ = (
+        Index("ix_photos_couple_uploaded", "couple_code", "uploaded_at"),
+        Index("ix_photos_couple_activity", "couple_code", "activity_id", "uploaded_at"),
+        Index("ix_photos_couple_blog_entry", "couple_code", "blog_entry_id", "uploaded_at"),
+        # The file endpoint finds a photo by its file name
+        Index("ix_photos_file_path", "file_path"),
+        Index("ix_photos_checksum", "checksum"),
+    )
+
+# One stored file per distinct content, shared by every photo with that
+# checksum (see backend/blobs.py)
+class PhotoBlob(Base):
+    __tablename__ = "photo_blobs"
+
+    sha256 = Column(String, primary_key=True)
+    file_path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)  # photos rows with this checksum
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Resized copies of a photo (see backend/thumbnails.py), one per size name
+class PhotoVariant(Base):
+    __tablename__ = "photo_variants"
+
+    photo_id = Column(Integer, ForeignKey('photos.id'), primary_key=True)
+    size = Column(String, primary_key=True)  # 'thumb', 'small', 'medium'
+    file_path = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
-# --- Badge Logic Placeholder ---
-def calculate_badges(db: AsyncSession, couple_code: str):
-    # Example: return list of badge names/ids based on activity counts, streaks, etc.
-    return []
+# Per-couple change counter for each collection, bumped on every write
+# (see backend/changes.py). Lets list endpoints answer conditional
+# requests without touching the row tables.
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+
+    couple_code = Column(String, primary_key=True)
+    collection = Column(String, primary_key=True)  # table name, e.g. "books"
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Per-couple running totals that badge rules are evaluated against,
+# maintained by the write hooks in backend/badges.py
+class CoupleCounter(Base):
+    __tablename__ = "couple_counters"
+
+    couple_code = Column(String, primary_key=True)
+    counter = Column(String, primary_key=True)  # e.g. "books_read", "activities_completed:outdoor"
+    value = Column(Integer, nullable=False, default=0)
+
+async def get_photos(
+    db: AsyncSession,
+    code: str,
+    activity_id: int = None,
+    blog_entry_id: int = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None
+) -> Page:
+    query = Photo.__table__.select().where(Photo.couple_code == code)
+    if activity_id:
+        query = query.where(Photo.activity_id == activity_id)
+    if blog_entry_id:
+        query = query.where(Photo.blog_entry_id == blog_entry_id)
+    query = keyset(query, Photo.uploaded_at, Photo.id, cursor, limit)
+    result = await db.execute(query)
+    return to_page(result.fetchall(), limit, "uploaded_at")
 
 # Database operations
+@cached("activities")
 async def get_activities(
     db: AsyncSession,
     code: str = None,
     category: schemas.Category = None,
     difficulty: schemas.Difficulty = None,
     cost: schemas.Cost = None,
-    season: schemas.Season = None
-):
+    season: schemas.Season = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+    columns: list = None
+) -> Page:
     try:
-        query = select(Activity)
+        # columns narrows the SELECT to a projection and returns plain rows
+        query = select(*columns) if columns else select(Activity)
         
         if code:
             query = query.filter(Activity.couple_code == code)
@@ -113,8 +211,11 @@ async def get_activities(
         if season:
             query = query.filter(Activity.season == season)
         
+        query = keyset(query, Activity.created_at, Activity.id, cursor, limit)
         result = await db.execute(query)
-        return result.scalars().all()
+        return to_page(result.all() if columns else result.scalars(), limit, "created_at")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error in get_activities: {str(e)}")
         raise
@@ -151,9 +252,12 @@ async def update_activity(db: AsyncSession, activity_id: int, activity: schemas.
     await db.refresh(db_activity)
     return db_activity
 
-async def get_books(db: AsyncSession, code: str):
-    result = await db.execute(select(Book).filter(Book.couple_code == code))
-    return result.scalars().all()
+@cached("books")
+async def get_books(db: AsyncSession, code: str, limit: int = DEFAULT_LIMIT, cursor: str = None, columns: list = None) -> Page:
+    query = select(*columns) if columns else select(Book)
+    query = keyset(query.filter(Book.couple_code == code), Book.created_at, Book.id, cursor, limit)
+    result = await db.execute(query)
+    return to_page(result.all() if columns else result.scalars(), limit, "created_at")
 
 async def create_book(db: AsyncSession, book: schemas.BookCreate, code: str):
     book_data = book.dict()
@@ -182,9 +286,12 @@ async def update_book(db: AsyncSession, book_id: int, book: schemas.BookUpdate,
     await db.refresh(db_book)
     return db_book
 
-async def get_movies(db: AsyncSession, code: str):
-    result = await db.execute(select(Movie).filter(Movie.couple_code == code))
-    return result.scalars().all()
+@cached("movies")
+async def get_movies(db: AsyncSession, code: str, limit: int = DEFAULT_LIMIT, cursor: str = None, columns: list = None) -> Page:
+    query = select(*columns) if columns else select(Movie)
+    query = keyset(query.filter(Movie.couple_code == code), Movie.created_at, Movie.id, cursor, limit)
+    result = await db.execute(query)
+    return to_page(result.all() if columns else result.scalars(), limit, "created_at")
 
 async def create_movie(db: AsyncSession, movie: schemas.MovieCreate, code: str):
     movie_data = movie.dict()
@@ -208,6 +315,10 @@ async def update_movie(db: AsyncSession, movie_id: int, movie: schemas.MovieUpda
     
     for key, value in movie.dict(exclude_unset=True).items():
         setattr(db_movie, key, value)
+    
+    await db.commit()
+    await db.refresh(db_movie)
+    return db_movie
 
 # Calendar Model
 class CalendarEvent(Base):
@@ -224,26 +335,45 @@ class CalendarEvent(Base):
     recurrence = Column(String, nullable=True)  # 'daily', 'weekly', 'monthly', 'yearly', or null for one-time
     color = Column(String, nullable=True)  # Color code for the calendar event
     reminder = Column(Integer, nullable=True)  # Minutes before event to remind
+    remind_at = Column(DateTime, nullable=True)  # When the next reminder is due, kept by backend/reminders.py
     created_at = Column(DateTime, default=datetime.utcnow)
     created_by = Column(String, nullable=True)  # Which partner created the event
     shared = Column(Boolean, default=True)  # If false, only visible to creator
-    couple_code = Column(String, index=True)
+    couple_code = Column(String)
     activity_id = Column(Integer, ForeignKey('activities.id'), nullable=True)  # Optional link to an activity
     
     # Relationship to Activity if one exists
     activity = relationship("Activity", foreign_keys=[activity_id])
 
+    __table_args__ = (
+        Index("ix_calendar_events_couple_start", "couple_code", "start_time"),
+        # Only pending reminders are indexed, so the scheduler's horizon scan stays small
+        Index("ix_calendar_events_remind_at", "remind_at", sqlite_where=text("remind_at IS NOT NULL")),
+    )
+
 # Calendar CRUD operations
-async def get_calendar_events(db: AsyncSession, code: str, start_date: datetime = None, end_date: datetime = None):
-    query = select(CalendarEvent).filter(CalendarEvent.couple_code == code)
+@cached("calendar_events")
+async def get_calendar_events(
+    db: AsyncSession,
+    code: str,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+    columns: list = None
+) -> Page:
+    if start_date or end_date:
+        # A window gets every occurrence overlapping it, recurring ones included
+        from backend.recurrence import get_occurrences
+        return await get_occurrences(db, code, start_date, end_date, limit, cursor, columns)
+
+    query = select(*columns) if columns else select(CalendarEvent)
+    query = query.filter(CalendarEvent.couple_code == code)
     
-    if start_date:
-        query = query.filter(CalendarEvent.start_time >= start_date)
-    if end_date:
-        query = query.filter(CalendarEvent.start_time <= end_date)
-        
+    # Calendar pages run forward in time
+    query = keyset(query, CalendarEvent.start_time, CalendarEvent.id, cursor, limit, descending=False)
     result = await db.execute(query)
-    return result.scalars().all()
+    return to_page(result.all() if columns else result.scalars(), limit, "start_time")
 
 async def create_calendar_event(db: AsyncSession, event: schemas.CalendarEventCreate, code: str, partner_id: str = None):
     try:
@@ -293,14 +423,12 @@ async def delete_calendar_event(db: AsyncSession, event_id: int, code: str):
     await db.commit()
     return {"status": "success"}
 
-    
-    await db.commit()
-    await db.refresh(db_movie)
-    return db_movie
-
-async def get_blog_entries(db: AsyncSession, code: str):
-    result = await db.execute(select(BlogEntry).filter(BlogEntry.couple_code == code))
-    return result.scalars().all()
+@cached("blog_entries")
+async def get_blog_entries(db: AsyncSession, code: str, limit: int = DEFAULT_LIMIT, cursor: str = None, columns: list = None) -> Page:
+    query = select(*columns) if columns else select(BlogEntry)
+    query = keyset(query.filter(BlogEntry.couple_code == code), BlogEntry.created_at, BlogEntry.id, cursor, limit)
+    result = await db.execute(query)
+    return to_page(result.all() if columns else result.scalars(), limit, "created_at")
 
 async def create_blog_entry(db: AsyncSession, entry: schemas.BlogEntryCreate, code: str):
     entry_data = entry.dict()
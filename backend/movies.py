@@ -1,26 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from backend import models
 from backend import schemas
+from backend import pagination, projections, etags, serialization
+from .auth import validate_code_param
 from backend.database import get_db
 
 router = APIRouter()
 
 @router.get("/movies/", response_model=List[schemas.Movie])
-async def get_movies(db: AsyncSession = Depends(get_db), code: Optional[str] = None):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
-    return await models.get_movies(db, code)
+async def get_movies(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    code: str = Depends(validate_code_param),
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[projections.View] = None
+):
+    unchanged = await etags.check(request, response, db, code, "movies")
+    if unchanged:
+        return unchanged
+    columns = projections.MOVIES.columns(fields, view)
+    page = await models.get_movies(db, code, limit, cursor, columns)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, None if columns else schemas.Movie, response)
 
 @router.post("/movies/", response_model=schemas.Movie)
 async def create_movie(
     movie: schemas.MovieCreate,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None
+    code: str = Depends(validate_code_param)
 ):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
     try:
         return await models.create_movie(db, movie, code)
     except Exception as e:
@@ -32,10 +45,8 @@ async def update_movie(
     movie_id: int,
     movie: schemas.MovieUpdate,
     db: AsyncSession = Depends(get_db),
-    code: Optional[str] = None
+    code: str = Depends(validate_code_param)
 ):
-    if not code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
     try:
         return await models.update_movie(db, movie_id, movie, code)
     except HTTPException:
@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+# Cursors are opaque to clients: base64 of the last row's (sort value, id)
+def pack_cursor(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def unpack_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    return pack_cursor([sort_value.isoformat(), row_id])
+
+def decode_cursor(cursor: str):
+    try:
+        sort_value, row_id = unpack_cursor(cursor)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def keyset(query, sort_column, id_column, cursor: Optional[str], limit: int, descending: bool = True):
+    """Order by (sort_column, id_column), resume after the cursor and fetch one extra row."""
+    if cursor:
+        key = tuple_(sort_column, id_column)
+        after = tuple_(*decode_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+def to_page(rows, limit: int, sort_attr: str) -> Page:
+    rows = list(rows)
+    if len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor(getattr(last, sort_attr), last.id))
+
+def limit_param():
+    return Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+
+def set_page_headers(response: Response, page: Page, limit: int):
+    response.headers["X-Limit"] = str(limit)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
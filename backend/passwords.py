@@ -0,0 +1,62 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# Password hashing.
+#
+# bcrypt is deliberately slow (~0.2 s a hash at 12 rounds), so it never
+# runs on the event loop. Hashes are computed on a small dedicated thread
+# pool (bcrypt releases the GIL while it works) and at most
+# PASSWORD_HASH_QUEUE calls may be running or waiting at once; a caller
+# that can't get a slot within PASSWORD_HASH_TIMEOUT gets a 503 instead
+# of piling more work onto an overloaded worker. Login rehashes a
+# password whose stored hash uses other parameters than the current ones.
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", "64"))  # running + waiting
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))  # seconds to wait for a slot
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_slots = asyncio.Semaphore(PASSWORD_HASH_QUEUE)
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(PASSWORD_HASH_WORKERS, thread_name_prefix="passwords")
+    return _executor
+
+async def _run(fn, *args):
+    try:
+        await asyncio.wait_for(_slots.acquire(), PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins right now, please try again",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor(), fn, *args)
+    finally:
+        _slots.release()
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed: str):
+    """(matches, new hash or None); a new hash means the stored one should be replaced."""
+    if not hashed:
+        # Same cost as a real check, so unknown accounts don't answer faster
+        await _run(pwd_context.dummy_verify)
+        return False, None
+    return await _run(pwd_context.verify_and_update, password, hashed)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,61 +1,168 @@
+import asyncio
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Query, UploadFile, File, HTTPException, Depends, Request, Response, status, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from backend import models, schemas
+from backend import models, schemas, pagination, etags, serialization, storage, thumbnails, blobs, file_responses
+from backend.imaging import SIZES
+from .auth import validate_couple_code_form, validate_couple_code_param
 from backend.database import get_db
-from datetime import datetime
 
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+UPLOAD_DIR = storage.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Files of one bulk upload streamed to disk at the same time
+BULK_UPLOAD_CONCURRENCY = int(os.environ.get("BULK_UPLOAD_CONCURRENCY", "4"))
+BULK_UPLOAD_MAX_FILES = int(os.environ.get("BULK_UPLOAD_MAX_FILES", "50"))
+
 router = APIRouter()
 
 @router.post("/photos/", response_model=schemas.Photo)
 async def upload_photo(
-    couple_code: str = Form(...),
+    background_tasks: BackgroundTasks,
+    couple_code: str = Depends(validate_couple_code_form),
     activity_id: Optional[int] = Form(None),
     blog_entry_id: Optional[int] = Form(None),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db)
 ):
-    if not couple_code:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Couple code is required")
-    filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    rel_path = f"uploads/{filename}"
+    stored = await blobs.store(db, file, storage.MAX_PHOTO_BYTES)
     photo = models.Photo(
-        file_path=rel_path,
+        file_path=stored.file_path,
         activity_id=activity_id,
         blog_entry_id=blog_entry_id,
-        couple_code=couple_code
+        couple_code=couple_code,
+        checksum=stored.sha256
     )
     db.add(photo)
-    await db.commit()
+    try:
+        await db.commit()
+    except Exception:
+        # Don't leave a file no row points at; existing blobs are shared
+        if stored.created:
+            storage.discard(os.path.join(blobs.BACKEND_DIR, stored.file_path))
+        raise
     await db.refresh(photo)
+    # Resized copies for galleries, rendered after the response is sent
+    background_tasks.add_task(thumbnails.generate_variants, photo.id, os.path.join(blobs.BACKEND_DIR, stored.file_path))
     return photo
 
+@router.post("/photos/bulk", response_model=List[schemas.PhotoUploadResult])
+async def upload_photos(
+    background_tasks: BackgroundTasks,
+    couple_code: str = Depends(validate_couple_code_form),
+    activity_id: Optional[int] = Form(None),
+    blog_entry_id: Optional[int] = Form(None),
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload an album in one request; each file succeeds or fails on its own"""
+    if len(files) > BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_UPLOAD_MAX_FILES} files per upload",
+        )
+    results = [{"filename": file.filename, "photo": None, "error": None} for file in files]
+    received = [None] * len(files)
+    slots = asyncio.Semaphore(BULK_UPLOAD_CONCURRENCY)
+
+    async def receive(i: int, file: UploadFile):
+        async with slots:
+            try:
+                received[i] = await storage.receive_upload(file, UPLOAD_DIR, storage.MAX_PHOTO_BYTES)
+            except HTTPException as e:
+                results[i]["error"] = e.detail
+            except OSError as e:
+                print(f"Error receiving {file.filename}: {str(e)}")
+                results[i]["error"] = "Could not store file"
+
+    created = []
+    added = []
+    try:
+        await asyncio.gather(*(receive(i, file) for i, file in enumerate(files)))
+        # One file at a time from here: the session is not safe to share
+        # between tasks
+        for i, file in enumerate(files):
+            if received[i] is None:
+                continue
+            try:
+                stored = await blobs.place(db, received[i], file.filename)
+            except OSError as e:
+                print(f"Error storing {file.filename}: {str(e)}")
+                results[i]["error"] = "Could not store file"
+                continue
+            finally:
+                received[i] = None
+            if stored.created:
+                created.append(os.path.join(blobs.BACKEND_DIR, stored.file_path))
+            photo = models.Photo(
+                file_path=stored.file_path,
+                activity_id=activity_id,
+                blog_entry_id=blog_entry_id,
+                couple_code=couple_code,
+                checksum=stored.sha256
+            )
+            db.add(photo)
+            added.append((i, photo))
+        # Every photo row in one transaction
+        await db.commit()
+    except BaseException:
+        for partial in received:
+            if partial is not None:
+                storage.discard(partial.path)
+        for path in created:
+            storage.discard(path)
+        raise
+
+    for i, photo in added:
+        results[i]["photo"] = photo
+        background_tasks.add_task(
+            thumbnails.generate_variants, photo.id, os.path.join(blobs.BACKEND_DIR, photo.file_path)
+        )
+    return results
+
 @router.get("/photos/", response_model=List[schemas.Photo])
 async def list_photos(
-    couple_code: str,
+    request: Request,
+    response: Response,
+    couple_code: str = Depends(validate_couple_code_param),
     activity_id: Optional[int] = None,
     blog_entry_id: Optional[int] = None,
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    query = models.Photo.__table__.select().where(models.Photo.couple_code == couple_code)
-    if activity_id:
-        query = query.where(models.Photo.activity_id == activity_id)
-    if blog_entry_id:
-        query = query.where(models.Photo.blog_entry_id == blog_entry_id)
-    result = await db.execute(query)
-    return result.fetchall()
-
-@router.get("/photos/file/{filename}")
-async def get_photo_file(filename: str):
+    unchanged = await etags.check(request, response, db, couple_code, "photos")
+    if unchanged:
+        return unchanged
+    page = await models.get_photos(db, couple_code, activity_id, blog_entry_id, limit, cursor)
+    pagination.set_page_headers(response, page, limit)
+    return serialization.render_list(page.items, schemas.Photo, response)
+
+@router.api_route("/photos/file/{filename}", methods=["GET", "HEAD"])
+async def get_photo_file(
+    filename: str,
+    request: Request,
+    size: Optional[str] = Query(None, description=f"Resized WebP copy: {', '.join(SIZES)}")
+):
     file_path = os.path.join(UPLOAD_DIR, filename)
-    if not os.path.exists(file_path):
+    stat_result = await file_responses.stat_file(file_path)
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    if size is not None:
+        if size not in SIZES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown size: {size}. Choose from {', '.join(SIZES)}",
+            )
+        # Falls back to the original for files that aren't images
+        variant = await thumbnails.get_variant(filename, size)
+        variant_stat = await file_responses.stat_file(variant) if variant else None
+        if variant_stat is not None:
+            file_path, stat_result = variant, variant_stat
+        else:
+            # Not immutable: this URL should get the variant once there is one
+            return file_responses.PhotoFileResponse(
+                file_path, stat_result, request, cache_control=file_responses.REVALIDATE
+            )
+    return file_responses.PhotoFileResponse(file_path, stat_result, request)
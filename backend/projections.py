@@ -0,0 +1,89 @@
+from enum import Enum
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import case, func
+from backend import models, schemas
+from backend.challenge_models import Goal
+
+# Sparse fieldsets (?fields=id,title) and summary views (?view=summary)
+# for list endpoints. Both select only the needed columns in SQL, so long
+# Text columns are never read or hydrated for list screens.
+
+EXCERPT_LENGTH = 160
+
+class View(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+class Projection:
+    def __init__(self, model, schema, sort_attr: str, summary: List[str], excerpt_of: str):
+        self.model = model
+        self.schema = schema
+        self.sort_attr = sort_attr
+        self.summary = summary
+        self.excerpt_of = excerpt_of
+
+    def columns(self, fields: Optional[str] = None, view: Optional[View] = None):
+        """Columns to select, or None when the full row was asked for."""
+        if not fields and view in (None, View.FULL):
+            return None
+
+        if fields:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+            unknown = [name for name in names if name not in self.schema.model_fields]
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown fields: {', '.join(unknown)}"
+                )
+        elif view == View.SUMMARY:
+            names = list(self.summary)
+        else:
+            names = list(self.schema.model_fields)
+
+        # Pagination needs the keyset columns whatever the client asked for
+        for required in ("id", self.sort_attr):
+            if required not in names:
+                names.insert(0, required)
+
+        columns = [getattr(self.model, name) for name in dict.fromkeys(names)]
+        if view == View.SUMMARY:
+            text = getattr(self.model, self.excerpt_of)
+            columns.append(
+                case(
+                    (func.length(text) > EXCERPT_LENGTH, func.substr(text, 1, EXCERPT_LENGTH).concat("…")),
+                    else_=text,
+                ).label("excerpt")
+            )
+        return columns
+
+ACTIVITIES = Projection(
+    models.Activity, schemas.Activity, "created_at",
+    summary=["id", "title", "status", "category", "mood", "created_at"],
+    excerpt_of="description",
+)
+BOOKS = Projection(
+    models.Book, schemas.Book, "created_at",
+    summary=["id", "title", "author", "status", "rating", "created_at"],
+    excerpt_of="review",
+)
+MOVIES = Projection(
+    models.Movie, schemas.Movie, "created_at",
+    summary=["id", "title", "genre", "status", "rating", "created_at"],
+    excerpt_of="review",
+)
+BLOG_ENTRIES = Projection(
+    models.BlogEntry, schemas.BlogEntry, "created_at",
+    summary=["id", "title", "mood", "created_at"],
+    excerpt_of="content",
+)
+CALENDAR_EVENTS = Projection(
+    models.CalendarEvent, schemas.CalendarEventOut, "start_time",
+    summary=["id", "title", "start_time", "end_time", "all_day", "event_type", "color"],
+    excerpt_of="description",
+)
+GOALS = Projection(
+    Goal, schemas.Goal, "created_at",
+    summary=["id", "title", "completed", "priority", "target_date", "created_at"],
+    excerpt_of="description",
+)
@@ -0,0 +1,115 @@
+import asyncio
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from backend import models, schemas, challenge_ops, projections, reminders, suggestions
+from backend.migrations import upgrade
+from backend.pagination import encode_cursor
+from backend.cache import read_cache
+
+# Query-plan regression check: runs each endpoint's real query function
+# against a scratch database, captures the SELECTs it issues and fails if
+# SQLite plans a full table scan or a sort step for any of them. Either
+# one makes a page cost grow with the couple's history.
+#
+#   python -m backend.query_plans
+
+# Global catalog tables where scanning every row is expected
+ALLOWED_SCANS = {"challenges"}
+
+CODE = "PLAN01"
+NOW = datetime(2024, 1, 1)
+CURSOR = encode_cursor(NOW, 10)
+
+QUERIES = [
+    ("GET /activities/", lambda db: models.get_activities(db, code=CODE)),
+    ("GET /activities/?category", lambda db: models.get_activities(db, code=CODE, category=schemas.Category.OUTDOOR)),
+    ("GET /activities/?difficulty", lambda db: models.get_activities(db, code=CODE, difficulty=schemas.Difficulty.EASY)),
+    ("GET /activities/?cost", lambda db: models.get_activities(db, code=CODE, cost=schemas.Cost.FREE)),
+    ("GET /activities/?season", lambda db: models.get_activities(db, code=CODE, season=schemas.Season.SUMMER)),
+    ("GET /activities/?category&cursor", lambda db: models.get_activities(db, code=CODE, category=schemas.Category.OUTDOOR, cursor=CURSOR)),
+    ("GET /activities/suggest", lambda db: suggestions.suggest_activity(db, CODE)),
+    ("GET /activities/suggest (preferences)", lambda db: suggestions.get_preferences(db, CODE)),
+    ("GET /books/", lambda db: models.get_books(db, CODE)),
+    ("GET /books/?cursor", lambda db: models.get_books(db, CODE, cursor=CURSOR)),
+    ("GET /movies/", lambda db: models.get_movies(db, CODE)),
+    ("GET /blog-entries/", lambda db: models.get_blog_entries(db, CODE)),
+    ("GET /blog-entries/?view=summary", lambda db: models.get_blog_entries(
+        db, CODE, columns=projections.BLOG_ENTRIES.columns(view=projections.View.SUMMARY))),
+    ("GET /photos/", lambda db: models.get_photos(db, CODE)),
+    ("GET /photos/?activity_id", lambda db: models.get_photos(db, CODE, activity_id=1)),
+    ("GET /calendar/", lambda db: models.get_calendar_events(db, CODE, NOW, NOW + timedelta(days=30))),
+    ("GET /calendar/?cursor", lambda db: models.get_calendar_events(db, CODE, NOW, NOW + timedelta(days=30), cursor=CURSOR)),
+    ("GET /calendar/?start_date", lambda db: models.get_calendar_events(db, CODE, NOW)),
+    ("GET /calendar/ (no window)", lambda db: models.get_calendar_events(db, CODE)),
+    ("Reminder horizon", lambda db: db.execute(reminders.due_by(NOW + timedelta(hours=1)))),
+    ("GET /challenges/", lambda db: challenge_ops.get_couple_challenges(db, CODE)),
+    ("POST /challenges/{id}/start", lambda db: challenge_ops.start_challenge(db, 1, CODE)),
+    ("GET /goals/", lambda db: challenge_ops.get_couple_goals(db, CODE)),
+    ("GET /goals/?cursor", lambda db: challenge_ops.get_couple_goals(db, CODE, cursor=CURSOR)),
+]
+
+# Virtual tables (FTS5, R*Tree) report a constrained lookup as a SCAN with
+# a non-empty index string after the colon
+SCAN = re.compile(r"^SCAN (\w+)(?: VIRTUAL TABLE INDEX \d+:(\S*))?")
+
+def full_scans(plan):
+    scans = []
+    for detail in plan:
+        match = SCAN.match(detail)
+        if match and match.group(1) not in ALLOWED_SCANS and not match.group(2):
+            scans.append(detail)
+        elif detail.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            scans.append(detail)
+    return scans
+
+async def collect_plans():
+    """Return [(label, sql, [plan detail, ...]), ...] for every captured SELECT."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/plans.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade)
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        plans = []
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                for label, run in QUERIES:
+                    captured.clear()
+                    # A cache hit would issue no SQL
+                    read_cache.clear()
+                    suggestions.preferences.clear()
+                    await run(db)
+                    for statement, parameters in list(captured):
+                        conn = await db.connection()
+                        result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+                        plans.append((label, statement, [row[3] for row in result]))
+        finally:
+            await engine.dispose()
+        return plans
+
+def main() -> int:
+    failures = 0
+    for label, statement, plan in asyncio.run(collect_plans()):
+        scans = full_scans(plan)
+        print(f"{'FAIL' if scans else 'ok  '} {label}")
+        for detail in plan:
+            print(f"       {detail}")
+        failures += bool(scans)
+    if failures:
+        print(f"✗ {failures} queries fall back to a full table scan or sort")
+        return 1
+    print("✓ No full table scans or sorts")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
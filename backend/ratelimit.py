@@ -0,0 +1,255 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from backend import couples
+from backend.token_cache import token_cache
+
+# Admission control and per-client rate limiting.
+#
+# Each client gets two token buckets, one for reads (GET, HEAD) and one
+# for writes (everything else). A client is its couple code (header or
+# ?code= / ?couple_code=), if that code is registered. Otherwise it is
+# the user behind an already verified bearer token, and failing both,
+# the peer address. Unverified codes and tokens can't be made up to get
+# fresh buckets. A client may have at most MAX_CLIENT_WRITES writes in
+# flight. On top of that, at most MAX_INFLIGHT_WRITES writes run at once
+# across all clients, since SQLite has a single writer; up to
+# WRITE_QUEUE_SIZE more wait their turn for WRITE_QUEUE_TIMEOUT seconds.
+# A multipart upload takes that global slot when its handler starts
+# reading the body, so uploads waiting for a handler don't hold one; every
+# other write takes it before the app runs, so a handler that never reads
+# its body still counts.
+# Anything over a limit gets a 429 with Retry-After. Counters and the
+# emptiest buckets are served at /metrics/ratelimit.
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+READS_PER_SECOND = float(os.environ.get("RATE_LIMIT_READS_PER_SECOND", "50"))
+READ_BURST = float(os.environ.get("RATE_LIMIT_READ_BURST", "200"))
+WRITES_PER_SECOND = float(os.environ.get("RATE_LIMIT_WRITES_PER_SECOND", "5"))
+WRITE_BURST = float(os.environ.get("RATE_LIMIT_WRITE_BURST", "30"))
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", "10000"))
+MAX_INFLIGHT_WRITES = int(os.environ.get("MAX_INFLIGHT_WRITES", "4"))
+MAX_CLIENT_WRITES = int(os.environ.get("MAX_CLIENT_WRITES", "2"))
+WRITE_QUEUE_SIZE = int(os.environ.get("WRITE_QUEUE_SIZE", "64"))
+WRITE_QUEUE_TIMEOUT = float(os.environ.get("WRITE_QUEUE_TIMEOUT", "10"))  # seconds
+
+READ = "read"
+WRITE = "write"
+READ_METHODS = {"GET", "HEAD"}
+
+# Monitoring and CORS preflights are never limited
+EXEMPT_PREFIXES = ("/metrics/",)
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def take(self, now: float) -> float:
+        """0 if a token was taken, else seconds until one will be available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+def client_key(scope: Scope) -> str:
+    headers = Headers(scope=scope)
+    query = QueryParams(scope.get("query_string", b""))
+    code = headers.get("x-couple-code") or query.get("code") or query.get("couple_code")
+    if code and couples.index.known(code):
+        return f"couple:{code}"
+    authorization = headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        user_id = token_cache.user_id(authorization[7:])
+        if user_id is not None:
+            return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def redact(key: str) -> str:
+    # Couple codes are credentials; metrics show just enough to tell them apart
+    kind, _, value = key.partition(":")
+    return f"{kind}:{value[:2]}…" if kind == "couple" else key
+
+class RateLimiter:
+    def __init__(self):
+        self.budgets = {READ: (READS_PER_SECOND, READ_BURST), WRITE: (WRITES_PER_SECOND, WRITE_BURST)}
+        self._buckets = OrderedDict()  # (client key, READ or WRITE) -> TokenBucket
+        self._writes = asyncio.Semaphore(MAX_INFLIGHT_WRITES)
+        self._client_writes = {}  # client key -> writes in flight, from first byte to response
+        self.inflight_writes = 0
+        self.queued_writes = 0
+        self.allowed = {READ: 0, WRITE: 0}
+        self.limited = {READ: 0, WRITE: 0}
+        self.queue_full = 0
+        self.queue_timeouts = 0
+        self.client_full = 0
+        self.evictions = 0
+
+    def take(self, key: str, kind: str) -> float:
+        """0 if the client may go ahead, else seconds to wait."""
+        now = time.monotonic()
+        bucket = self._buckets.get((key, kind))
+        if bucket is None:
+            bucket = self._buckets[(key, kind)] = TokenBucket(*self.budgets[kind], now)
+            while len(self._buckets) > RATE_LIMIT_MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._buckets.move_to_end((key, kind))
+        wait = bucket.take(now)
+        if wait:
+            self.limited[kind] += 1
+        else:
+            self.allowed[kind] += 1
+        return wait
+
+    def enter_client(self, key: str) -> bool:
+        """Count a write for the client; False if it already has MAX_CLIENT_WRITES in flight."""
+        count = self._client_writes.get(key, 0)
+        if count >= MAX_CLIENT_WRITES:
+            self.client_full += 1
+            return False
+        self._client_writes[key] = count + 1
+        return True
+
+    def leave_client(self, key: str):
+        count = self._client_writes.pop(key) - 1
+        if count:
+            self._client_writes[key] = count
+
+    async def admit_write(self) -> bool:
+        """Wait for a write slot; False if the queue is full or the wait timed out."""
+        if self.queued_writes >= WRITE_QUEUE_SIZE:
+            self.queue_full += 1
+            return False
+        self.queued_writes += 1
+        try:
+            await asyncio.wait_for(self._writes.acquire(), WRITE_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            return False
+        finally:
+            self.queued_writes -= 1
+        self.inflight_writes += 1
+        return True
+
+    def release_write(self):
+        self.inflight_writes -= 1
+        self._writes.release()
+
+    def stats(self, limit: int = 50) -> dict:
+        now = time.monotonic()
+        buckets = []
+        for (key, kind), bucket in self._buckets.items():
+            tokens = min(bucket.capacity, bucket.tokens + (now - bucket.updated_at) * bucket.rate)
+            if tokens < bucket.capacity:
+                buckets.append({"client": redact(key), "kind": kind, "tokens": round(tokens, 2), "capacity": bucket.capacity})
+        buckets.sort(key=lambda b: b["tokens"] / b["capacity"])
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "reads_per_second": READS_PER_SECOND,
+            "read_burst": READ_BURST,
+            "writes_per_second": WRITES_PER_SECOND,
+            "write_burst": WRITE_BURST,
+            "max_inflight_writes": MAX_INFLIGHT_WRITES,
+            "max_client_writes": MAX_CLIENT_WRITES,
+            "writing_clients": len(self._client_writes),
+            "inflight_writes": self.inflight_writes,
+            "queued_writes": self.queued_writes,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "queue_full": self.queue_full,
+            "queue_timeouts": self.queue_timeouts,
+            "client_full": self.client_full,
+            "buckets": len(self._buckets),
+            "evictions": self.evictions,
+            # Only partly drained buckets, emptiest first
+            "draining": buckets[:limit],
+        }
+
+limiter = RateLimiter()
+
+def too_many_requests(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Too many requests, please slow down"},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def is_upload(scope: Scope) -> bool:
+    headers = Headers(scope=scope)
+    has_body = "transfer-encoding" in headers or headers.get("content-length", "0") != "0"
+    return has_body and headers.get("content-type", "").startswith("multipart/form-data")
+
+class WriteSlot:
+    """A request's global write slot, taken up front or on the app's first receive()."""
+
+    def __init__(self):
+        self.held = False
+
+    async def acquire(self) -> bool:
+        self.held = await limiter.admit_write()
+        return self.held
+
+    def on_receive(self, receive: Receive) -> Receive:
+        async def wrapped():
+            if not self.held and not await self.acquire():
+                # Raised inside the app, which answers it like any HTTPException
+                raise HTTPException(status_code=429, detail="Too many requests, please slow down", headers={"Retry-After": "1"})
+            return await receive()
+        return wrapped
+
+    def release(self):
+        if self.held:
+            self.held = False
+            limiter.release_write()
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not RATE_LIMIT_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = client_key(scope)
+        kind = READ if scope["method"] in READ_METHODS else WRITE
+        wait = limiter.take(key, kind)
+        if wait:
+            await too_many_requests(wait)(scope, receive, send)
+            return
+        if kind == READ:
+            await self.app(scope, receive, send)
+            return
+        if not limiter.enter_client(key):
+            await too_many_requests(1)(scope, receive, send)
+            return
+        slot = WriteSlot()
+        try:
+            if is_upload(scope):
+                await self.app(scope, slot.on_receive(receive), send)
+            elif await slot.acquire():
+                await self.app(scope, receive, send)
+            else:
+                await too_many_requests(1)(scope, receive, send)
+        finally:
+            slot.release()
+            limiter.leave_client(key)
@@ -0,0 +1,225 @@
+import heapq
+import zlib
+from calendar import monthrange
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from sqlalchemy import event, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend.models import CalendarEvent
+from backend.pagination import Page, decode_cursor, encode_cursor
+
+# Recurrence expansion for calendar windows.
+#
+# A window [start, end] needs every occurrence that overlaps it, ordered
+# by (occurrence start, event id). Those come from two places:
+#
+# * events whose first start is inside the window: read in start order
+#   from ix_calendar_events_couple_start, limit + 1 rows at most, since
+#   each of them contributes its first occurrence in that same order;
+# * events that started earlier but are still live at the window start
+#   (long events and recurring series): looked up in calendar_spans, an
+#   R*Tree over each event's (couple, first start, last end) span.
+#
+# Each event becomes a lazy generator of its occurrences, starting at the
+# first one that can reach the window, and heapq.merge interleaves them.
+# Work is proportional to the occurrences returned plus the live series,
+# not to the couple's whole calendar history.
+
+SPANS = "calendar_spans"
+
+# Spans are stored in whole minutes since the epoch, which fits rtree_i32
+EPOCH = datetime(1970, 1, 1)
+FOREVER = 2 ** 31 - 1  # span end of a series that never stops recurring
+
+FIXED_STEPS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+MONTH_STEPS = {"monthly": 1, "yearly": 12}
+
+def couple_key(code: str) -> int:
+    # Couple dimension of the R*Tree; collisions are filtered on couple_code
+    return zlib.crc32(code.encode()) & 0x7FFFFFFF
+
+def _minutes(moment: datetime, round_up: bool = False) -> int:
+    minutes, rest = divmod(moment - EPOCH, timedelta(minutes=1))
+    return minutes + 1 if round_up and rest else minutes
+
+def is_recurring(recurrence) -> bool:
+    return recurrence in FIXED_STEPS or recurrence in MONTH_STEPS
+
+def rrule(start_time: datetime, recurrence):
+    """iCalendar RRULE value for a series, or None for a one-time event."""
+    if recurrence in FIXED_STEPS:
+        return f"FREQ={recurrence.upper()}"
+    if recurrence not in MONTH_STEPS:
+        return None
+    rule = f"FREQ={recurrence.upper()}"
+    if recurrence == "yearly":
+        rule += f";BYMONTH={start_time.month}"
+    if start_time.day > 28:
+        # The latest of these days each month: what add_months clamps to
+        days = ",".join(str(day) for day in range(28, start_time.day + 1))
+        rule += f";BYMONTHDAY={days};BYSETPOS=-1"
+    return rule
+
+def duration_of(start_time: datetime, end_time: datetime) -> timedelta:
+    if end_time is None or end_time < start_time:
+        return timedelta(0)
+    return end_time - start_time
+
+def span_of(start_time: datetime, end_time: datetime, recurrence):
+    """(first start, last end) in minutes, widened to whole minutes."""
+    if is_recurring(recurrence):
+        return _minutes(start_time), FOREVER
+    return _minutes(start_time), _minutes(start_time + duration_of(start_time, end_time), round_up=True)
+
+# --- Span index maintenance ---
+def create(conn):
+    """Create the span index (sync connection)."""
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SPANS} "
+        "USING rtree_i32(id, couple_min, couple_max, span_start, span_end)"
+    ))
+
+def _index(conn, event_id: int, code: str, start_time: datetime, end_time: datetime, recurrence):
+    span_start, span_end = span_of(start_time, end_time, recurrence)
+    key = couple_key(code)
+    conn.execute(
+        text(f"INSERT OR REPLACE INTO {SPANS} VALUES (:id, :key, :key, :span_start, :span_end)"),
+        {"id": event_id, "key": key, "span_start": span_start, "span_end": span_end},
+    )
+
+def rebuild(conn):
+    """Re-index every calendar event (sync connection)."""
+    conn.execute(text(f"DELETE FROM {SPANS}"))
+    rows = conn.execute(select(
+        CalendarEvent.id, CalendarEvent.couple_code, CalendarEvent.start_time,
+        CalendarEvent.end_time, CalendarEvent.recurrence,
+    ))
+    for row in rows:
+        if row.couple_code and row.start_time:
+            _index(conn, row.id, row.couple_code, row.start_time, row.end_time, row.recurrence)
+
+@event.listens_for(Session, "after_flush")
+def _update_spans(session, flush_context):
+    events = [obj for obj in chain(session.new, session.dirty, session.deleted) if isinstance(obj, CalendarEvent)]
+    if not events:
+        return
+    conn = session.connection(bind_arguments={"writer": True})
+    for obj in events:
+        if obj in session.deleted or not obj.couple_code:
+            conn.execute(text(f"DELETE FROM {SPANS} WHERE id = :id"), {"id": obj.id})
+        elif obj in session.new or session.is_modified(obj, include_collections=False):
+            _index(conn, obj.id, obj.couple_code, obj.start_time, obj.end_time, obj.recurrence)
+
+# --- Expansion ---
+def add_months(moment: datetime, months: int) -> datetime:
+    # The 31st falls back to the last day of shorter months, Feb 29 to Feb 28
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, monthrange(year, month)[1]))
+
+def _months_between(earlier: datetime, later: datetime) -> int:
+    return (later.year - earlier.year) * 12 + later.month - earlier.month
+
+def occurrence_starts(start_time: datetime, recurrence, not_before: datetime):
+    """Starts of the series from the last one before not_before onwards (unbounded)."""
+    if recurrence in FIXED_STEPS:
+        step = FIXED_STEPS[recurrence]
+        n = max(0, (not_before - start_time) // step)
+        while True:
+            yield start_time + n * step
+            n += 1
+    elif recurrence in MONTH_STEPS:
+        step = MONTH_STEPS[recurrence]
+        # Each start is computed from the first, so clamped days don't drift
+        n = max(0, _months_between(start_time, not_before) // step - 1)
+        while True:
+            yield add_months(start_time, n * step)
+            n += 1
+    else:
+        yield start_time
+
+def occurrences(row, window_start: datetime, window_end: datetime = None, after=None):
+    """(start, id, end, row) for each occurrence of row overlapping the window, in order."""
+    duration = duration_of(row.start_time, row.end_time)
+    lower = window_start if after is None else max(window_start, after[0])
+    # Occurrences starting this early can still run into the window
+    not_before = lower - duration if lower - datetime.min > duration else datetime.min
+    for start in occurrence_starts(row.start_time, row.recurrence, not_before):
+        if window_end is not None and start > window_end:
+            return
+        end = start + duration
+        if end < window_start:
+            continue
+        if after is not None and (start, row.id) <= after:
+            continue
+        yield start, row.id, end, row
+
+def _occurrence(start: datetime, end: datetime, row, keys) -> dict:
+    item = row._asdict()
+    item["start_time"] = start
+    if row.end_time is not None:
+        item["end_time"] = end
+    return {key: item[key] for key in keys}
+
+async def get_occurrences(
+    db: AsyncSession,
+    code: str,
+    window_start: datetime = None,
+    window_end: datetime = None,
+    limit: int = 50,
+    cursor: str = None,
+    columns: list = None
+) -> Page:
+    window_start = window_start or datetime.min
+    after = decode_cursor(cursor) if cursor else None
+    # Events keyed at or before this point were already under way when the
+    # page starts and come from the span index; later ones from the start
+    # index, where each fetched row is sure to yield an occurrence
+    since = max(window_start, after[0]) if after else window_start
+    key = tuple_(CalendarEvent.start_time, CalendarEvent.id)
+    if after and after[0] >= window_start:
+        begun, unbegun = key <= tuple_(*after), key > tuple_(*after)
+    else:
+        begun, unbegun = CalendarEvent.start_time < since, CalendarEvent.start_time >= since
+
+    table = CalendarEvent.__table__.c
+    selected = list(columns) if columns else list(table)
+    keys = [column.key for column in selected]
+    needed = [table.id, table.start_time, table.end_time, table.recurrence]
+    query_columns = selected + [column for column in needed if column.key not in keys]
+
+    started = select(*query_columns).filter(CalendarEvent.couple_code == code).filter(unbegun)
+    if window_end is not None:
+        started = started.filter(CalendarEvent.start_time <= window_end)
+    started = started.order_by(CalendarEvent.start_time, CalendarEvent.id).limit(limit + 1)
+    rows = list((await db.execute(started)).all())
+
+    # The span index is in whole minutes, so the exact times are re-checked
+    # on the rows themselves
+    spans = await db.execute(text(
+        f"SELECT id FROM {SPANS} WHERE couple_min <= :key AND couple_max >= :key "
+        "AND span_start <= :since AND span_end >= :window_start"
+    ), {
+        "key": couple_key(code),
+        "since": _minutes(since) if since > EPOCH else -FOREVER,
+        "window_start": _minutes(window_start) if window_start > EPOCH else -FOREVER,
+    })
+    live_ids = [row.id for row in spans]
+    if live_ids:
+        live = await db.execute(
+            select(*query_columns)
+            .filter(CalendarEvent.id.in_(live_ids))
+            .filter(CalendarEvent.couple_code == code)
+            .filter(begun)
+        )
+        rows += live.all()
+
+    merged = heapq.merge(*(occurrences(row, window_start, window_end, after) for row in rows))
+    items = [_occurrence(start, end, row, keys) for start, _, end, row in islice(merged, limit + 1)]
+    if len(items) <= limit:
+        return Page(items)
+    items = items[:limit]
+    return Page(items, encode_cursor(items[-1]["start_time"], items[-1]["id"]))
@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import importlib
+import os
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import NamedTuple
+from sqlalchemy import bindparam, event, inspect, update
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend.database import AsyncSessionLocal
+from backend.models import CalendarEvent
+from backend.recurrence import is_recurring, occurrence_starts
+
+# Calendar event reminders.
+#
+# Every event with a reminder stores when its next one is due in
+# calendar_events.remind_at, set on each write that touches start_time,
+# reminder or recurrence and indexed only where it is not null. The
+# scheduler loads the reminders due within a rolling horizon from that
+# index into a heap and sleeps until the earliest one. Commits that add,
+# move or delete an event reschedule it in place, so the table is never
+# polled as a whole. A fired one-time reminder clears remind_at; a
+# recurring one moves on to the next occurrence.
+#
+# Reminders go to a sink: an async callable taking a Reminder, named by
+# REMINDER_SINK as "module:function" (printed to the log by default).
+# Run the scheduler in one process only (REMINDERS_ENABLED=0 elsewhere),
+# or each process delivers every reminder.
+
+REMINDERS_ENABLED = os.environ.get("REMINDERS_ENABLED", "1") == "1"
+REMINDER_HORIZON = float(os.environ.get("REMINDER_HORIZON", "3600"))  # seconds loaded ahead
+REMINDER_GRACE = float(os.environ.get("REMINDER_GRACE", "300"))  # seconds late still worth delivering
+REMINDER_SINK = os.environ.get("REMINDER_SINK")
+
+RETRY_DELAY = 30  # seconds to wait after a failed pass
+
+class Reminder(NamedTuple):
+    event_id: int
+    couple_code: str
+    title: str
+    start_time: datetime
+    remind_at: datetime
+
+async def print_sink(reminder: Reminder):
+    print(f"Reminder for {reminder.couple_code}: {reminder.title} at {reminder.start_time:%Y-%m-%d %H:%M}")
+
+def load_sink(path: str = None):
+    if not path:
+        return print_sink
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def next_remind_at(start_time: datetime, reminder, recurrence, after: datetime):
+    """When to remind of the first occurrence starting after `after`, or None."""
+    if reminder is None or start_time is None:
+        return None
+    for start in occurrence_starts(start_time, recurrence, after):
+        if start > after:
+            return start - timedelta(minutes=reminder)
+        if not is_recurring(recurrence):
+            return None
+
+def due_by(until: datetime):
+    # Must stay on ix_calendar_events_remind_at, hence the IS NOT NULL
+    return (
+        select(CalendarEvent.id, CalendarEvent.remind_at)
+        .filter(CalendarEvent.remind_at.isnot(None))
+        .filter(CalendarEvent.remind_at <= until)
+    )
+
+# --- Write hooks ---
+WATCHED = ("start_time", "reminder", "recurrence")
+
+@event.listens_for(CalendarEvent, "before_insert")
+@event.listens_for(CalendarEvent, "before_update")
+def _set_remind_at(mapper, connection, target):
+    state = inspect(target)
+    if state.persistent and not any(state.attrs[field].history.has_changes() for field in WATCHED):
+        return
+    target.remind_at = next_remind_at(target.start_time, target.reminder, target.recurrence, datetime.utcnow())
+
+@event.listens_for(Session, "after_flush")
+def _collect_reschedules(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, CalendarEvent):
+            continue
+        if obj in session.deleted:
+            session.info.setdefault("reminder_changes", {})[obj.id] = None
+        elif inspect(obj).attrs.remind_at.history.has_changes():
+            session.info.setdefault("reminder_changes", {})[obj.id] = obj.remind_at
+
+@event.listens_for(Session, "after_commit")
+def _apply_reschedules(session):
+    for event_id, remind_at in session.info.pop("reminder_changes", {}).items():
+        scheduler.reschedule(event_id, remind_at)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reschedules(session):
+    session.info.pop("reminder_changes", None)
+
+# --- Scheduler ---
+class ReminderScheduler:
+    def __init__(self, horizon: float = REMINDER_HORIZON, grace: float = REMINDER_GRACE, sink=None):
+        self.horizon = timedelta(seconds=horizon)
+        self.grace = timedelta(seconds=grace)
+        self.sink = sink
+        self._heap = []  # (remind_at, event_id), including superseded entries
+        self._due = {}  # event_id -> remind_at of its live heap entry
+        self._loaded_until = datetime.min
+        self._reload_at = datetime.min
+        self._wakeup = asyncio.Event()
+
+    def reschedule(self, event_id: int, remind_at):
+        """Track an event's new remind_at (None to drop it)."""
+        # Entries past the horizon are picked up by the next load instead
+        if remind_at is None or remind_at > self._loaded_until:
+            self._due.pop(event_id, None)
+            return
+        if self._due.get(event_id) == remind_at:
+            return
+        self._due[event_id] = remind_at
+        heapq.heappush(self._heap, (remind_at, event_id))
+        self._wakeup.set()
+
+    def _pop_due(self, now: datetime):
+        """The earliest live entry due by now, taken off the heap; None if there is none."""
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, event_id = heapq.heappop(self._heap)
+            # Superseded by a later reschedule, or dropped
+            if self._due.get(event_id) == remind_at:
+                del self._due[event_id]
+                return event_id, remind_at
+        return None
+
+    def _requeue(self, event_id: int, remind_at: datetime):
+        # Unless a reschedule replaced it meanwhile
+        if event_id not in self._due:
+            self._due[event_id] = remind_at
+            heapq.heappush(self._heap, (remind_at, event_id))
+
+    async def load(self, now: datetime):
+        until = now + self.horizon
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(due_by(until))).all()
+        # Commits landing during the read were either seen by it or arrive
+        # as reschedules after this point
+        self._loaded_until = until
+        # Reload halfway through the horizon, well before it runs out
+        self._reload_at = now + self.horizon / 2
+        self._heap = [(row.remind_at, row.id) for row in rows]
+        heapq.heapify(self._heap)
+        self._due = {row.id: row.remind_at for row in rows}
+
+    async def fire(self, event_id: int, remind_at: datetime, now: datetime):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    CalendarEvent.couple_code, CalendarEvent.title, CalendarEvent.start_time,
+                    CalendarEvent.reminder, CalendarEvent.recurrence,
+                ).filter(CalendarEvent.id == event_id).filter(CalendarEvent.remind_at == remind_at)
+            )
+            row = result.first()
+            if row is None:
+                # Changed or deleted since it was scheduled
+                return
+            occurrence = remind_at + timedelta(minutes=row.reminder)
+            following = next_remind_at(row.start_time, row.reminder, row.recurrence, occurrence)
+            # Only the scheduler that still sees this remind_at moves it on
+            result = await db.execute(
+                update(CalendarEvent)
+                .where(CalendarEvent.id == event_id)
+                .where(CalendarEvent.remind_at == remind_at)
+                .values(remind_at=following)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if result.rowcount != 1:
+            return
+        self.reschedule(event_id, following)
+        # Late is fine while the event is still ahead, e.g. one created
+        # closer to its start than its reminder lead time
+        if remind_at >= now - self.grace or occurrence > now:
+            try:
+                await self.sink(Reminder(event_id, row.couple_code, row.title, occurrence, remind_at))
+            except Exception:
+                # Move it back, unless the event changed meanwhile, so the retry finds it
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(CalendarEvent)
+                        .where(CalendarEvent.id == event_id)
+                        .where(CalendarEvent.remind_at == following)
+                        .values(remind_at=remind_at)
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+                self._due.pop(event_id, None)
+                raise
+        else:
+            print(f"Skipped reminder for event {event_id}: due {remind_at:%Y-%m-%d %H:%M}, event already started")
+
+    async def run(self):
+        self.sink = self.sink or load_sink(REMINDER_SINK)
+        while True:
+            try:
+                now = datetime.utcnow()
+                if now >= self._reload_at:
+                    await self.load(now)
+                # One at a time, so a failure leaves the rest in the heap
+                while True:
+                    due = self._pop_due(now)
+                    if due is None:
+                        break
+                    try:
+                        await self.fire(*due, now)
+                    except Exception:
+                        # Retried after the delay, if it hasn't been moved on
+                        self._requeue(*due)
+                        raise
+            except Exception as e:
+                print(f"Error delivering reminders: {str(e)}")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            wake = self._reload_at
+            if self._heap:
+                wake = min(wake, self._heap[0][0])
+            self._wakeup.clear()
+            try:
+                timeout = max((wake - datetime.utcnow()).total_seconds(), 0)
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+scheduler = ReminderScheduler()
+
+# --- Backfill ---
+def rebuild(conn):
+    """Recompute remind_at for every event with a reminder (sync connection)."""
+    now = datetime.utcnow()
+    rows = conn.execute(
+        select(CalendarEvent.id, CalendarEvent.start_time, CalendarEvent.reminder, CalendarEvent.recurrence)
+        .filter(CalendarEvent.reminder.isnot(None))
+    )
+    values = [
+        {"event_id": row.id, "remind_at": next_remind_at(row.start_time, row.reminder, row.recurrence, now)}
+        for row in rows
+    ]
+    if values:
+        conn.execute(
+            update(CalendarEvent.__table__)
+            .where(CalendarEvent.__table__.c.id == bindparam("event_id"))
+            .values(remind_at=bindparam("remind_at")),
+            values,
+        )
@@ -34,6 +34,14 @@ class UserOut(BaseModel):
 class CoupleCode(BaseModel):
     code: str
 
+class CoupleCreate(BaseModel):
+    code: Optional[str] = None  # generated when omitted
+
+class Couple(CoupleCode):
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
 class Category(str, Enum):
     OUTDOOR = "outdoor"
     INDOOR = "indoor"
@@ -147,10 +155,17 @@ class Photo(BaseModel):
     blog_entry_id: Optional[int] = None
     couple_code: str
     uploaded_at: datetime
+    checksum: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+# One file of a bulk upload: the new photo, or why that file failed
+class PhotoUploadResult(BaseModel):
+    filename: Optional[str] = None
+    photo: Optional[Photo] = None
+    error: Optional[str] = None
+
 class BlogEntryUpdate(BlogEntryBase):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -268,6 +283,16 @@ class ChallengeProgress(BaseModel):
     class Config:
         from_attributes = True
 
+class Streak(BaseModel):
+    streak: str
+    period_days: int
+    current: int
+    longest: int
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 # Goal Schemas
 class GoalBase(BaseModel):
     title: str
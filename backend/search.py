@@ -0,0 +1,173 @@
+import asyncio
+import re
+import sys
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import pagination, serialization
+from backend.database import engine, get_db
+from .auth import validate_couple_code
+
+# Full-text search over a couple's blog entries, activities, books and movies.
+#
+# One FTS5 table holds a copy of the searchable text of every row. Its
+# rowid is id * 8 + the source's number, so each source row maps to
+# exactly one index row. Triggers on the source tables keep it in step
+# with every insert, update and delete, whatever code path wrote them.
+# Results are ranked by bm25 with title matches weighted above body
+# matches, and pages are keyed on (rank, rowid).
+#
+#   python -m backend.search --rebuild
+
+INDEX = "search_index"
+
+# table -> (number, title column, body columns)
+SOURCES = {
+    "blog_entries": (0, "title", ("content",)),
+    "activities": (1, "title", ("description", "notes")),
+    "books": (2, "title", ("author", "review")),
+    "movies": (3, "title", ("director", "review")),
+}
+KINDS = ", ".join(SOURCES)
+
+SNIPPET_TOKENS = 12
+MARK_START = "<mark>"
+MARK_END = "</mark>"
+
+router = APIRouter()
+
+# --- Schema ---
+def _body(table: str, row: str) -> str:
+    _, _, columns = SOURCES[table]
+    return "trim(" + " || ' ' || ".join(f"coalesce({row}.{column}, '')" for column in columns) + ")"
+
+def _index_values(table: str, row: str) -> str:
+    number, title, _ = SOURCES[table]
+    return f"{row}.id * 8 + {number}, {row}.couple_code, '{table}', {row}.{title}, {_body(table, row)}"
+
+def _index_row(table: str, row: str) -> str:
+    return f"INSERT INTO {INDEX} (rowid, couple_code, kind, title, body) VALUES ({_index_values(table, row)})"
+
+def _unindex_row(table: str, row: str) -> str:
+    number, _, _ = SOURCES[table]
+    return f"DELETE FROM {INDEX} WHERE rowid = {row}.id * 8 + {number}"
+
+def create(conn):
+    """Create the index table and its sync triggers (sync connection)."""
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX} USING fts5("
+        "couple_code, kind UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ))
+    # Column weights: couple_code and kind only scope results
+    conn.execute(text(f"INSERT INTO {INDEX} ({INDEX}, rank) VALUES ('rank', 'bm25(0.0, 0.0, 10.0, 1.0)')"))
+    for table, (_, title, columns) in SOURCES.items():
+        watched = ", ".join(("couple_code", title) + columns)
+        triggers = {
+            f"{INDEX}_{table}_insert": f"AFTER INSERT ON {table} BEGIN {_index_row(table, 'new')}; END",
+            f"{INDEX}_{table}_update": (
+                f"AFTER UPDATE OF {watched} ON {table} BEGIN "
+                f"{_unindex_row(table, 'old')}; {_index_row(table, 'new')}; END"
+            ),
+            f"{INDEX}_{table}_delete": f"AFTER DELETE ON {table} BEGIN {_unindex_row(table, 'old')}; END",
+        }
+        for name, body in triggers.items():
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text(f"CREATE TRIGGER {name} {body}"))
+
+def rebuild(conn):
+    """Re-index every source row from scratch (sync connection)."""
+    conn.execute(text(f"DELETE FROM {INDEX}"))
+    for table in SOURCES:
+        conn.execute(text(
+            f"INSERT INTO {INDEX} (rowid, couple_code, kind, title, body) "
+            f"SELECT {_index_values(table, table)} FROM {table}"
+        ))
+    conn.execute(text(f"INSERT INTO {INDEX} ({INDEX}) VALUES ('optimize')"))
+
+# --- Queries ---
+WORD = re.compile(r"\w+\*?")
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+def match_expression(code: str, q: str) -> str:
+    """FTS5 query matching every word of q (word* for a prefix) in one couple's rows."""
+    words = WORD.findall(q)
+    if not words:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query has no words")
+    terms = " ".join(_quote(word.rstrip("*")) + ("*" if word.endswith("*") else "") for word in words)
+    return f"couple_code : {_quote(code)} AND ({terms})"
+
+async def search(
+    db: AsyncSession,
+    code: str,
+    q: str,
+    kinds: Optional[list] = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    cursor: Optional[str] = None
+) -> pagination.Page:
+    params = {"match": match_expression(code, q), "code": code, "limit": limit + 1}
+    filters = ""
+    if kinds:
+        filters += " AND kind IN (" + ", ".join(f":kind{i}" for i in range(len(kinds))) + ")"
+        params.update((f"kind{i}", kind) for i, kind in enumerate(kinds))
+    if cursor:
+        try:
+            after_rank, after_rowid = pagination.unpack_cursor(cursor)
+            params.update(after_rank=float(after_rank), after_rowid=int(after_rowid))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        filters += " AND (rank > :after_rank OR (rank = :after_rank AND rowid > :after_rowid))"
+
+    result = await db.execute(text(
+        f"SELECT rowid, rank, kind, rowid / 8 AS id, "
+        f"highlight({INDEX}, 2, '{MARK_START}', '{MARK_END}') AS title, "
+        f"snippet({INDEX}, 3, '{MARK_START}', '{MARK_END}', '…', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {INDEX} WHERE {INDEX} MATCH :match AND couple_code = :code{filters} "
+        f"ORDER BY rank, rowid LIMIT :limit"
+    ), params)
+    rows = result.all()
+    if len(rows) <= limit:
+        return pagination.Page(rows)
+    rows = rows[:limit]
+    return pagination.Page(rows, pagination.pack_cursor([rows[-1].rank, rows[-1].rowid]))
+
+@router.get("/search")
+async def search_entries(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = Query(None, description=f"Comma-separated subset of: {KINDS}"),
+    limit: int = pagination.limit_param(),
+    cursor: Optional[str] = None,
+    code: str = Depends(validate_couple_code),
+    db: AsyncSession = Depends(get_db)
+):
+    """Search the couple's blog entries, activities, books and movies, best matches first"""
+    kinds = [name.strip() for name in kind.split(",") if name.strip()] if kind else None
+    unknown = set(kinds or ()) - set(SOURCES)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown kind: {', '.join(sorted(unknown))}. Choose from {KINDS}",
+        )
+    page = await search(db, code, q, kinds, limit, cursor)
+    pagination.set_page_headers(response, page, limit)
+    results = [
+        {"kind": row.kind, "id": row.id, "title": row.title, "snippet": row.snippet}
+        for row in page.items
+    ]
+    return serialization.render_json(results, response)
+
+async def _rebuild():
+    async with engine.begin() as conn:
+        await conn.run_sync(create)
+        await conn.run_sync(rebuild)
+
+if __name__ == "__main__":
+    if "--rebuild" not in sys.argv[1:]:
+        print("usage: python -m backend.search --rebuild")
+        sys.exit(2)
+    asyncio.run(_rebuild())
+    print("✓ Search index rebuilt")
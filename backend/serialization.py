@@ -0,0 +1,65 @@
+from functools import lru_cache
+from operator import attrgetter
+from typing import List, Optional, Type
+import pydantic_core
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+# Fast path for large list responses.
+#
+# FastAPI's response_model handling validates each ORM row into a model,
+# dumps it back to a dict and then runs json.dumps over the result.
+# Rows that come straight from our own tables are trusted: we read the
+# schema's fields off them and encode the list in one go with
+# pydantic-core's Rust JSON encoder. Untrusted input can still be
+# validated, as a whole list in a single TypeAdapter call.
+
+@lru_cache(maxsize=None)
+def _fields(schema: Type[BaseModel]):
+    fields = tuple(schema.model_fields)
+    return fields, attrgetter(*fields)
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+def to_dicts(rows, schema: Optional[Type[BaseModel]] = None) -> list:
+    """Plain dicts for ORM objects, Core rows or dicts, limited to the schema's fields if given."""
+    if schema is None:
+        return [row if isinstance(row, dict) else row._asdict() for row in rows]
+    fields, getter = _fields(schema)
+    dicts = []
+    for row in rows:
+        if isinstance(row, dict):
+            dicts.append({name: row[name] for name in fields if name in row})
+        elif hasattr(row, "_mapping"):
+            mapping = row._mapping
+            dicts.append({name: mapping[name] for name in fields if name in mapping})
+        elif len(fields) == 1:
+            dicts.append({fields[0]: getter(row)})
+        else:
+            dicts.append(dict(zip(fields, getter(row))))
+    return dicts
+
+def encode_list(rows, schema: Optional[Type[BaseModel]] = None, trusted: bool = True) -> bytes:
+    if trusted or schema is None:
+        return pydantic_core.to_json(to_dicts(rows, schema))
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+def _json_response(content: bytes, response: Optional[Response]) -> Response:
+    # Returning a Response skips response_model, so carry over any headers
+    # the endpoint already set on the injected one (pagination, ETag)
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers=dict(response.headers) if response is not None else None,
+    )
+
+def render_list(rows, schema: Optional[Type[BaseModel]] = None, response: Optional[Response] = None, trusted: bool = True) -> Response:
+    """JSON response for ORM objects or Core rows (all columns when schema is None)."""
+    return _json_response(encode_list(rows, schema, trusted), response)
+
+def render_json(content, response: Optional[Response] = None) -> Response:
+    """JSON response for already-built dicts/lists."""
+    return _json_response(pydantic_core.to_json(content), response)
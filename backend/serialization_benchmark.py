@@ -0,0 +1,62 @@
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+# Serialization microbenchmark: encodes the same list of Activity ORM
+# rows to JSON three ways and reports the best time per row. The first is
+# FastAPI's own response_model handling (validate each row into a model,
+# dump it, json.dumps). The others are backend/serialization.py:
+# validating the whole list in one TypeAdapter call, and the trusted
+# path that reads schema fields straight off the rows.
+#
+#   python -m backend.serialization_benchmark [rows] [repeats]
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from backend import models, schemas, serialization
+
+def make_rows(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        models.Activity(
+            id=i, title=f"Activity {i}", description="x" * 200, status="planned", category="outdoor",
+            difficulty="easy", duration=60, cost="free", season="summer", mood="😀",
+            created_at=now, couple_code="BENCH1",
+        )
+        for i in range(count)
+    ]
+
+def response_model(rows) -> bytes:
+    field = create_response_field(name="response", type_=List[schemas.Activity])
+    content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+    return JSONResponse(content).body
+
+def best_of(fn, rows, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run(count: int, repeats: int):
+    rows = make_rows(count)
+    encoders = {
+        "response_model": response_model,
+        "batch-validated": lambda rows: serialization.encode_list(rows, schemas.Activity, trusted=False),
+        "trusted rows": lambda rows: serialization.encode_list(rows, schemas.Activity),
+    }
+    # All three must produce the same documents
+    outputs = [json.loads(encode(rows[:10])) for encode in encoders.values()]
+    assert all(output == outputs[0] for output in outputs), "encoders disagree"
+    for label, encode in encoders.items():
+        best = best_of(encode, rows, repeats)
+        print(f"{label:<20} {best * 1000:8.1f} ms   {best / count * 1e6:6.2f} us/row   ({count} rows, best of {repeats})")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(int(args[0]) if args else 10000, int(args[1]) if len(args) > 1 else 5)
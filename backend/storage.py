@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import NamedTuple
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+# Streaming storage for uploaded files.
+#
+# An upload is copied in fixed-size chunks into a temporary file next to
+# its destination, hashed as it goes, and renamed into place only once it
+# is complete, so readers never see a partial file and a failed or
+# oversized upload leaves nothing behind. Every write runs in the thread
+# pool, keeping the event loop free while large files land on disk, and
+# no more than one chunk per upload is held in memory at a time.
+
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+
+UPLOAD_CHUNK = 1024 * 1024  # bytes copied per read/write
+MAX_PHOTO_BYTES = int(os.environ.get("MAX_PHOTO_BYTES", str(20 * 1024 * 1024)))
+MAX_PROFILE_PICTURE_BYTES = int(os.environ.get("MAX_PROFILE_PICTURE_BYTES", str(5 * 1024 * 1024)))
+
+UNSAFE = re.compile(r"[^\w.-]+")
+
+# The mode open() would have given a new file. mkstemp creates its files
+# 0600 and os.replace keeps that, so uploads are given this mode instead.
+# Reading the umask means setting it, so that happens once, at import.
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+class StoredFile(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+def safe_name(filename: str) -> str:
+    # Keep only the final path component, and nothing the shell or URLs mind
+    name = UNSAFE.sub("_", os.path.basename(filename or "")).lstrip(".")
+    return name or "upload"
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is larger than {max_bytes} bytes",
+    )
+
+def discard(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _write(out, digest, chunk: bytes):
+    # hashlib releases the GIL on large buffers, so this overlaps the loop too
+    digest.update(chunk)
+    out.write(chunk)
+
+async def receive_upload(file: UploadFile, directory: str, max_bytes: int) -> StoredFile:
+    """Stream file into a temporary file in directory, enforcing max_bytes.
+
+    The returned path is that temporary file, already given FILE_MODE;
+    the caller moves it into place (or discards it).
+    """
+    # The multipart parser has already spooled the body, so its size may be known
+    if file.size is not None and file.size > max_bytes:
+        raise too_large(max_bytes)
+    fd, partial = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            os.fchmod(out.fileno(), FILE_MODE)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large(max_bytes)
+                await run_in_threadpool(_write, out, digest, chunk)
+    except BaseException:
+        # Also on cancellation (client gone), hence no await here
+        discard(partial)
+        raise
+    return StoredFile(partial, size, digest.hexdigest())
+
+async def save_upload(file: UploadFile, directory: str, filename: str, max_bytes: int) -> StoredFile:
+    """Stream file into directory/filename, enforcing max_bytes; returns its size and SHA-256."""
+    received = await receive_upload(file, directory, max_bytes)
+    path = os.path.join(directory, filename)
+    try:
+        await run_in_threadpool(os.replace, received.path, path)
+    except BaseException:
+        discard(received.path)
+        raise
+    return received._replace(path=path)
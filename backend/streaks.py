@@ -0,0 +1,224 @@
+import asyncio
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends
+from sqlalchemy import delete, event, inspect, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from typing import List
+from backend import schemas, serialization
+from backend.challenge_models import Challenge, ChallengeProgress, CompletionEvent, Streak
+from backend.database import AsyncSessionLocal, get_db
+from backend.models import Activity, BlogEntry
+from .auth import validate_couple_code
+
+# Streaks.
+#
+# Completions that can extend a streak are written to completion_events,
+# and the couple's row in streaks is advanced in the same flush: one
+# primary-key read and one upsert per event, never a scan of past events.
+# A streak is measured in periods (days or Monday-to-Sunday weeks) and
+# stays live until the end of the period after its latest event; after
+# that expire_streaks() zeroes it for every couple in one UPDATE over a
+# partial index of live streaks.
+
+STREAK_EXPIRY_INTERVAL = float(os.environ.get("STREAK_EXPIRY_INTERVAL", "3600"))  # seconds
+
+DAILY = 1
+WEEKLY = 7
+
+# Challenge categories that run as streaks; other challenges only log events
+CHALLENGE_PERIODS = {"daily": DAILY, "weekly": WEEKLY}
+
+BLOG = "blog"
+ACTIVITY = "activity"
+
+router = APIRouter()
+
+def challenge_streak(challenge_id: int) -> str:
+    return f"challenge:{challenge_id}"
+
+def period_of(moment: datetime, period_days: int) -> int:
+    # Ordinal day 1 (0001-01-01) is a Monday, so weeks start on Mondays
+    return (moment.date().toordinal() - 1) // period_days
+
+def period_start(period: int, period_days: int) -> datetime:
+    return datetime.fromordinal(period * period_days + 1)
+
+def advance(current: int, longest: int, last_period: int, period: int):
+    """Return (current, longest, last_period) after an event in period."""
+    if period <= last_period:
+        # Same period again, or a backdated event
+        return current, longest, last_period
+    current = current + 1 if period == last_period + 1 else 1
+    return current, max(longest, current), period
+
+def expires_at(last_period: int, period_days: int) -> datetime:
+    # Live through the following period, gone once it ends without an event
+    return period_start(last_period + 2, period_days)
+
+# --- Write hooks ---
+def _challenge_periods(conn, challenge_ids):
+    if not challenge_ids:
+        return {}
+    rows = conn.execute(select(Challenge.id, Challenge.category).filter(Challenge.id.in_(challenge_ids)))
+    return {row.id: CHALLENGE_PERIODS.get(row.category) for row in rows}
+
+def _changed_to(obj, field: str):
+    """(old, new) if this flush changed field, else None."""
+    history = inspect(obj).attrs[field].history
+    if not history.added:
+        return None
+    return (history.deleted[0] if history.deleted else None), history.added[0]
+
+def _events(session):
+    """(couple_code, streak, occurred_at, challenge_id) for completions in this flush."""
+    events = []
+    now = datetime.utcnow()
+    for obj in list(session.new) + list(session.dirty):
+        code = getattr(obj, "couple_code", None)
+        if not code:
+            continue
+        if isinstance(obj, BlogEntry) and obj in session.new:
+            events.append((code, BLOG, obj.created_at or now, None))
+        elif isinstance(obj, Activity):
+            change = _changed_to(obj, "status")
+            if change and change[1] == "completed" and change[0] != "completed":
+                events.append((code, ACTIVITY, obj.completed_at or now, None))
+        elif isinstance(obj, ChallengeProgress):
+            # Repeatable challenges are completed again by setting a new time
+            change = _changed_to(obj, "completed_at")
+            if change and change[1] is not None:
+                events.append((code, challenge_streak(obj.challenge_id), change[1], obj.challenge_id))
+    return events
+
+def _record(conn, code: str, streak: str, period_days: int, occurred_at: datetime):
+    conn.execute(insert(CompletionEvent).values(couple_code=code, streak=streak, occurred_at=occurred_at))
+    if not period_days:
+        return
+    row = conn.execute(
+        select(Streak.current, Streak.longest, Streak.last_period)
+        .filter(Streak.couple_code == code)
+        .filter(Streak.streak == streak)
+    ).first()
+    state = tuple(row) if row else (0, 0, 0)
+    current, longest, last_period = advance(*state, period_of(occurred_at, period_days))
+    if (current, longest, last_period) == state:
+        return
+    values = {
+        "period_days": period_days, "current": current, "longest": longest,
+        "last_period": last_period, "expires_at": expires_at(last_period, period_days),
+        "updated_at": datetime.utcnow(),
+    }
+    stmt = insert(Streak).values(couple_code=code, streak=streak, **values)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[Streak.couple_code, Streak.streak], set_=values,
+    ))
+
+@event.listens_for(Session, "after_flush")
+def _record_completions(session, flush_context):
+    events = _events(session)
+    if not events:
+        return
+    conn = session.connection(bind_arguments={"writer": True})
+    periods = _challenge_periods(conn, {challenge_id for *_, challenge_id in events if challenge_id})
+    for code, streak, occurred_at, challenge_id in sorted(events, key=lambda e: e[2]):
+        period_days = periods.get(challenge_id) if challenge_id else DAILY
+        _record(conn, code, streak, period_days, occurred_at)
+
+# --- Reads ---
+async def get_streaks(db: AsyncSession, code: str):
+    """A couple's streaks, with current already 0 for any past their expiry."""
+    result = await db.execute(select(Streak).filter(Streak.couple_code == code))
+    streaks = serialization.to_dicts(result.scalars().all(), schemas.Streak)
+    now = datetime.utcnow()
+    for streak in streaks:
+        # The expiry job may not have run since this one lapsed
+        if streak["expires_at"] is not None and streak["expires_at"] <= now:
+            streak["current"] = 0
+    return streaks
+
+@router.get("/streaks", response_model=List[schemas.Streak])
+async def read_streaks(
+    code: str = Depends(validate_couple_code),
+    db: AsyncSession = Depends(get_db)
+):
+    """Current and longest streaks for the couple"""
+    streaks = await get_streaks(db, code)
+    return serialization.render_json(streaks)
+
+# --- Expiry job ---
+async def expire_streaks(now: datetime = None) -> int:
+    """Zero every live streak whose window has passed, for all couples at once."""
+    now = now or datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Streak)
+            .where(Streak.current > 0)
+            .where(Streak.expires_at <= now)
+            .values(current=0)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+async def run_expiry(interval: float = STREAK_EXPIRY_INTERVAL):
+    while True:
+        try:
+            expired = await expire_streaks()
+            if expired:
+                print(f"Expired {expired} streaks")
+        except Exception as e:
+            print(f"Error expiring streaks: {str(e)}")
+        await asyncio.sleep(interval)
+
+# --- Backfill ---
+def rebuild(conn):
+    """Recreate completion events and streaks from the content tables (sync connection)."""
+    conn.execute(delete(Streak))
+    conn.execute(delete(CompletionEvent))
+
+    periods = {row.id: CHALLENGE_PERIODS.get(row.category) for row in conn.execute(select(Challenge.id, Challenge.category))}
+    events = []
+    for row in conn.execute(select(BlogEntry.couple_code, BlogEntry.created_at).filter(BlogEntry.created_at.isnot(None))):
+        events.append((row.couple_code, BLOG, row.created_at, DAILY))
+    for row in conn.execute(
+        select(Activity.couple_code, Activity.completed_at, Activity.created_at).filter(Activity.status == "completed")
+    ):
+        events.append((row.couple_code, ACTIVITY, row.completed_at or row.created_at, DAILY))
+    # Only the latest completion of each challenge was ever stored
+    for row in conn.execute(
+        select(ChallengeProgress.couple_code, ChallengeProgress.challenge_id, ChallengeProgress.completed_at)
+        .filter(ChallengeProgress.completed_at.isnot(None))
+    ):
+        events.append((row.couple_code, challenge_streak(row.challenge_id), row.completed_at, periods.get(row.challenge_id)))
+    events = [e for e in events if e[0] and e[2]]
+    if not events:
+        return
+
+    conn.execute(insert(CompletionEvent), [
+        {"couple_code": code, "streak": streak, "occurred_at": occurred_at}
+        for code, streak, occurred_at, _ in events
+    ])
+
+    states = {}
+    for code, streak, occurred_at, period_days in sorted(events, key=lambda e: e[2]):
+        if period_days:
+            key = (code, streak, period_days)
+            states[key] = advance(*states.get(key, (0, 0, 0)), period_of(occurred_at, period_days))
+    now = datetime.utcnow()
+    rows = []
+    for (code, streak, period_days), (current, longest, last_period) in states.items():
+        expiry = expires_at(last_period, period_days)
+        rows.append({
+            "couple_code": code, "streak": streak, "period_days": period_days,
+            "current": current if expiry > now else 0, "longest": longest,
+            "last_period": last_period, "expires_at": expiry, "updated_at": now,
+        })
+    if rows:
+        conn.execute(insert(Streak), rows)
+
+if __name__ == "__main__":
+    print(f"✓ Expired {asyncio.run(expire_streaks())} streaks")
@@ -0,0 +1,245 @@
+import os
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from itertools import chain
+import numpy as np
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from backend import schemas
+from backend.models import Activity
+
+# Activity suggestions.
+#
+# Each activity is a one-hot feature vector over category, difficulty,
+# cost, season and a duration bucket. A couple's preference vector is the
+# rating-weighted sum of the vectors of the activities they completed.
+# Suggesting scores every candidate with one matrix-vector product.
+# Preference vectors are cached per couple (LRU-bounded) and kept current
+# by applying each committed change's before/after difference, so they
+# are rebuilt from the activities table only on a cache miss.
+
+PREFERENCE_CACHE_TTL = float(os.environ.get("PREFERENCE_CACHE_TTL", "300"))  # seconds
+PREFERENCE_CACHE_SIZE = int(os.environ.get("PREFERENCE_CACHE_SIZE", "4096"))
+
+# Pick among this many top candidates so repeated asks don't always give
+# the same one; lower temperature favours the best score more strongly
+SUGGESTION_POOL = 5
+SUGGESTION_TEMPERATURE = 0.25
+
+# Bonus for candidates that suit the current season (or any season)
+SEASON_BONUS = 0.5
+
+DURATION_BUCKETS = (60, 180)  # minutes: up to an hour, up to three, longer
+
+FIELDS = {
+    "category": [c.value for c in schemas.Category],
+    "difficulty": [d.value for d in schemas.Difficulty],
+    "cost": [c.value for c in schemas.Cost],
+    "season": [s.value for s in schemas.Season],
+    "duration": list(range(len(DURATION_BUCKETS) + 1)),
+}
+OFFSETS = {}
+_offset = 0
+for _field, _values in FIELDS.items():
+    OFFSETS[_field] = {value: _offset + i for i, value in enumerate(_values)}
+    _offset += len(_values)
+DIMENSIONS = _offset
+
+FEATURE_COLUMNS = (Activity.category, Activity.difficulty, Activity.cost, Activity.season, Activity.duration)
+
+def feature_matrix(rows) -> np.ndarray:
+    """One row per activity of (category, difficulty, cost, season, duration) tuples."""
+    matrix = np.zeros((len(rows), DIMENSIONS), dtype=np.float32)
+    if not rows:
+        return matrix
+    positions = np.arange(len(rows))
+    for field, values in zip(FIELDS, zip(*rows)):
+        offsets = OFFSETS[field]
+        if field == "duration":
+            minutes = np.array([-1 if value is None else value for value in values], dtype=np.int64)
+            index = np.where(minutes >= 0, offsets[0] + np.searchsorted(DURATION_BUCKETS, minutes), -1)
+        else:
+            index = np.fromiter((offsets.get(value, -1) for value in values), dtype=np.int64, count=len(rows))
+        present = index >= 0
+        matrix[positions[present], index[present]] = 1.0
+    return matrix
+
+def weight(status, rating) -> float:
+    """How much a completed activity says about what a couple likes."""
+    if status != "completed":
+        return 0.0
+    if rating is None:
+        return 1.0
+    # 1 star pushes away from similar activities, 5 stars towards them
+    return rating - 2.5
+
+def current_season(now: datetime = None) -> str:
+    month = (now or datetime.utcnow()).month
+    if month in (3, 4, 5):
+        return schemas.Season.SPRING.value
+    if month in (6, 7, 8):
+        return schemas.Season.SUMMER.value
+    if month in (9, 10, 11):
+        return schemas.Season.FALL.value
+    return schemas.Season.WINTER.value
+
+# --- Preference vectors ---
+class PreferenceCache:
+    def __init__(self, ttl: float = PREFERENCE_CACHE_TTL, max_entries: int = PREFERENCE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # couple_code -> (expires_at, vector, completed count)
+        self._changed_at = OrderedDict()  # couple_code -> epoch of its latest change, oldest first
+        self._forgotten = 0  # latest epoch trimmed from _changed_at
+        self.epoch = 0
+
+    def get(self, code: str):
+        entry = self._entries.get(code)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[code]
+            return None
+        self._entries.move_to_end(code)
+        return entry[1], entry[2]
+
+    def set(self, code: str, vector: np.ndarray, count: int, since_epoch: int):
+        # A change committed while this was being read would be lost. Couples
+        # trimmed from _changed_at count as changed when they were trimmed.
+        if self._changed_at.get(code, self._forgotten) > since_epoch:
+            return
+        self._entries[code] = (time.monotonic() + self.ttl, vector, count)
+        self._entries.move_to_end(code)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def apply(self, code: str, delta: np.ndarray, count_delta: int):
+        self.epoch += 1
+        self._changed_at[code] = self.epoch
+        self._changed_at.move_to_end(code)
+        while len(self._changed_at) > self.max_entries:
+            _, self._forgotten = self._changed_at.popitem(last=False)
+        # Only couples already cached are updated; others load on next use
+        entry = self._entries.get(code)
+        if entry is not None:
+            self._entries[code] = (entry[0], entry[1] + delta, entry[2] + count_delta)
+
+    def clear(self):
+        self._entries.clear()
+        self._changed_at.clear()
+
+preferences = PreferenceCache()
+
+async def get_preferences(db: AsyncSession, code: str):
+    """(preference vector, number of completed activities) for a couple."""
+    cached = preferences.get(code)
+    if cached is not None:
+        return cached
+    since_epoch = preferences.epoch
+    result = await db.execute(
+        select(*FEATURE_COLUMNS, Activity.status, Activity.rating)
+        .filter(Activity.couple_code == code)
+        .filter(Activity.status == "completed")
+    )
+    rows = result.all()
+    weights = np.array([weight(row.status, row.rating) for row in rows], dtype=np.float32)
+    vector = weights @ feature_matrix(rows) if rows else np.zeros(DIMENSIONS, dtype=np.float32)
+    preferences.set(code, vector, len(rows), since_epoch)
+    return vector, len(rows)
+
+def _contribution(get):
+    row = tuple(get(column.key) for column in FEATURE_COLUMNS)
+    w = weight(get("status"), get("rating"))
+    return feature_matrix([row])[0] * w, 1 if get("status") == "completed" else 0
+
+def _old_value(obj, field: str):
+    history = inspect(obj).attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(obj, field)
+
+WATCHED = [column.key for column in FEATURE_COLUMNS] + ["status", "rating", "couple_code"]
+
+@event.listens_for(Session, "after_flush")
+def _collect_preference_changes(session, flush_context):
+    deltas = session.info.setdefault("preference_deltas", defaultdict(lambda: [np.zeros(DIMENSIONS, dtype=np.float32), 0]))
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Activity):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not any(state.attrs[field].history.has_changes() for field in WATCHED):
+            continue
+        if obj not in session.deleted:
+            vector, count = _contribution(lambda field: getattr(obj, field))
+            if obj.couple_code:
+                deltas[obj.couple_code][0] += vector
+                deltas[obj.couple_code][1] += count
+        if obj not in session.new:
+            old_code = _old_value(obj, "couple_code")
+            vector, count = _contribution(lambda field: _old_value(obj, field))
+            if old_code:
+                deltas[old_code][0] -= vector
+                deltas[old_code][1] -= count
+
+@event.listens_for(Session, "after_commit")
+def _apply_preference_changes(session):
+    for code, (delta, count) in session.info.pop("preference_deltas", {}).items():
+        preferences.apply(code, delta, count)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_preference_changes(session):
+    session.info.pop("preference_deltas", None)
+
+# --- Scoring ---
+def score(candidates: np.ndarray, vector: np.ndarray, count: int, seasons) -> np.ndarray:
+    """Score every candidate row of the feature matrix in one pass."""
+    scores = candidates @ (vector / max(count, 1))
+    season = current_season()
+    in_season = np.fromiter(
+        (value in (None, season, schemas.Season.ANY.value) for value in seasons), dtype=bool, count=len(seasons)
+    )
+    return scores + SEASON_BONUS * in_season
+
+def pick(scores: np.ndarray, rng: np.random.Generator = None) -> int:
+    """Index of the suggestion: a softmax draw among the top-scoring candidates."""
+    rng = rng or np.random.default_rng()
+    pool = min(SUGGESTION_POOL, len(scores))
+    # Jitter far below any real score difference so ties don't always
+    # resolve to the same rows
+    jittered = scores + rng.random(len(scores)) * 1e-6
+    top = np.argpartition(-jittered, pool - 1)[:pool]
+    odds = np.exp((scores[top] - scores[top].max()) / SUGGESTION_TEMPERATURE)
+    return int(top[rng.choice(pool, p=odds / odds.sum())])
+
+async def suggest_activity(
+    db: AsyncSession,
+    code: str,
+    category: schemas.Category = None,
+    difficulty: schemas.Difficulty = None,
+    cost: schemas.Cost = None,
+    season: schemas.Season = None
+):
+    """The couple's not-yet-completed activity that best fits what they enjoyed before."""
+    query = (
+        select(Activity.id, *FEATURE_COLUMNS)
+        .filter(Activity.couple_code == code)
+        .filter(Activity.status != "completed")
+    )
+    if category:
+        query = query.filter(Activity.category == category)
+    if difficulty:
+        query = query.filter(Activity.difficulty == difficulty)
+    if cost:
+        query = query.filter(Activity.cost == cost)
+    if season:
+        query = query.filter(Activity.season == season)
+    candidates = (await db.execute(query)).all()
+    if not candidates:
+        return None
+
+    vector, count = await get_preferences(db, code)
+    features = [tuple(row)[1:] for row in candidates]
+    scores = score(feature_matrix(features), vector, count, [row.season for row in candidates])
+    chosen = candidates[pick(scores)]
+    return await db.get(Activity, chosen.id)
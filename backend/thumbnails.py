@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+from backend import imaging
+from backend.database import AsyncSessionLocal
+from backend.models import Photo, PhotoVariant
+from backend.storage import UPLOAD_DIR
+
+# Responsive photo variants.
+#
+# After an upload, every size in imaging.SIZES is rendered as WebP in a
+# process pool (resizing is CPU-bound and would otherwise hold the event
+# loop or the GIL) and recorded in photo_variants. A request for a size
+# that isn't on disk yet, e.g. for photos uploaded before this existed,
+# renders it on demand; concurrent requests for the same variant share a
+# single render. The files themselves are the cache: once a variant
+# exists it is served straight from disk. Uploads that aren't images Pillow
+# can open (or are decompression bombs) are remembered for
+# THUMBNAIL_UNREADABLE_TTL seconds so requests stop retrying them.
+
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+THUMBNAIL_UNREADABLE_TTL = float(os.environ.get("THUMBNAIL_UNREADABLE_TTL", "3600"))  # seconds
+THUMBNAIL_UNREADABLE_SIZE = int(os.environ.get("THUMBNAIL_UNREADABLE_SIZE", "4096"))
+
+VARIANT_DIR = os.path.join(UPLOAD_DIR, "variants")
+os.makedirs(VARIANT_DIR, exist_ok=True)
+
+_pool = None
+_pending = {}  # variant path -> task rendering it
+_unreadable = OrderedDict()  # upload filename -> expires_at
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: forking a process with running threads and
+        # an event loop is unsafe
+        _pool = ProcessPoolExecutor(THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _mark_unreadable(filename: str):
+    _unreadable[filename] = time.monotonic() + THUMBNAIL_UNREADABLE_TTL
+    _unreadable.move_to_end(filename)
+    while len(_unreadable) > THUMBNAIL_UNREADABLE_SIZE:
+        _unreadable.popitem(last=False)
+
+def _is_unreadable(filename: str) -> bool:
+    expires_at = _unreadable.get(filename)
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        del _unreadable[filename]
+        return False
+    return True
+
+def variant_name(filename: str, size: str) -> str:
+    return f"{filename}.{size}.{imaging.EXTENSION}"
+
+def variant_path(filename: str, size: str) -> str:
+    return os.path.join(VARIANT_DIR, variant_name(filename, size))
+
+async def _record(photo_id: int, size: str, filename: str, dimensions):
+    width, height, length = dimensions
+    values = {
+        "file_path": f"uploads/variants/{variant_name(filename, size)}",
+        "width": width, "height": height, "bytes": length,
+    }
+    async with AsyncSessionLocal() as db:
+        stmt = insert(PhotoVariant).values(photo_id=photo_id, size=size, **values)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[PhotoVariant.photo_id, PhotoVariant.size], set_=values,
+        ))
+        await db.commit()
+
+async def _render(source: str, filename: str, size: str, photo_id: Optional[int]) -> Optional[str]:
+    dest = variant_path(filename, size)
+    loop = asyncio.get_running_loop()
+    try:
+        if os.path.exists(dest):
+            # Another photo with the same content (see backend/blobs.py)
+            dimensions = await loop.run_in_executor(pool(), imaging.describe, dest)
+        else:
+            dimensions = await loop.run_in_executor(pool(), imaging.render, source, dest, imaging.SIZES[size])
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        # Not an image Pillow will read: callers fall back to the original file
+        print(f"Could not render {size} variant of {filename}: {str(e)}")
+        _mark_unreadable(filename)
+        return None
+    except OSError as e:
+        # Possibly temporary (original gone, disk full, upload still being
+        # written): try again on the next request
+        print(f"Could not render {size} variant of {filename}: {str(e)}")
+        return None
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory on a huge image); start afresh next time
+        print(f"Thumbnail pool failed rendering {filename}: {str(e)}")
+        shutdown()
+        return None
+    if photo_id is None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Photo.id).filter(Photo.file_path == f"uploads/{filename}"))
+            photo_id = result.scalar()
+    if photo_id is not None:
+        await _record(photo_id, size, filename, dimensions)
+    return dest
+
+def _render_once(source: str, filename: str, size: str, photo_id: Optional[int] = None) -> asyncio.Task:
+    dest = variant_path(filename, size)
+    task = _pending.get(dest)
+    if task is None:
+        task = asyncio.ensure_future(_render(source, filename, size, photo_id))
+        _pending[dest] = task
+        task.add_done_callback(lambda _: _pending.pop(dest, None))
+    return task
+
+async def generate_variants(photo_id: int, source: str):
+    """Render every size of a newly uploaded photo (run as a background task)."""
+    filename = os.path.basename(source)
+    try:
+        await asyncio.gather(*(_render_once(source, filename, size, photo_id) for size in imaging.SIZES))
+    except Exception as e:
+        print(f"Error generating variants of photo {photo_id}: {str(e)}")
+
+async def get_variant(filename: str, size: str) -> Optional[str]:
+    """Path of the size variant of an uploaded file, rendering it if needed; None if it can't be."""
+    dest = variant_path(filename, size)
+    if await run_in_threadpool(os.path.exists, dest):
+        return dest
+    if _is_unreadable(filename):
+        return None
+    # Shielded: a client hanging up mid-render shouldn't waste the work
+    return await asyncio.shield(_render_once(os.path.join(UPLOAD_DIR, filename), filename, size))
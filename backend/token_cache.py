@@ -0,0 +1,125 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.models import User
+
+# In-process cache of verified bearer tokens and the users they belong to.
+#
+# A token that has passed JWT verification is remembered, under its
+# SHA-256 digest rather than the token itself, until its exp. Users are
+# cached by id, detached from any session, so an authenticated request
+# normally needs neither a signature check nor a database round trip.
+# Any committed write to a users row drops that user (write hooks below),
+# and a TTL bounds staleness when several worker processes share one
+# database. All maps are bounded.
+
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))  # seconds
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE, user_ttl: float = USER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.user_ttl = user_ttl
+        self._tokens = OrderedDict()  # token digest -> (exp, user_id)
+        self._users = OrderedDict()  # user_id -> (expires_at, user)
+        self._invalidated_at = OrderedDict()  # user_id -> epoch of its latest write, oldest first
+        self._forgotten = 0  # latest epoch trimmed from _invalidated_at
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def user_id(self, token: str) -> Optional[int]:
+        """The user id of an already verified, unexpired token; None if it must be verified."""
+        digest = token_digest(token)
+        entry = self._tokens.get(digest)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._tokens[digest]
+            return None
+        self._tokens.move_to_end(digest)
+        return entry[1]
+
+    def add_token(self, token: str, exp, user_id: int):
+        if exp is None:
+            return
+        self._tokens[token_digest(token)] = (float(exp), user_id)
+        self._trim(self._tokens)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._users.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def set_user(self, user: User, since_epoch: int):
+        # Drop a row read before a write to it committed. Users trimmed
+        # from _invalidated_at count as written when they were trimmed.
+        if self._invalidated_at.get(user.id, self._forgotten) > since_epoch:
+            return
+        self._users[user.id] = (time.monotonic() + self.user_ttl, user)
+        self._trim(self._users)
+
+    def invalidate(self, user_id: int):
+        self.epoch += 1
+        self._invalidated_at[user_id] = self.epoch
+        self._invalidated_at.move_to_end(user_id)
+        while len(self._invalidated_at) > self.max_entries:
+            _, self._forgotten = self._invalidated_at.popitem(last=False)
+        if self._users.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._tokens.clear()
+        self._users.clear()
+
+    def _trim(self, entries: OrderedDict):
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "max_entries": self.max_entries,
+            "user_ttl_seconds": self.user_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+token_cache = TokenCache()
+
+# --- Write hooks ---
+@event.listens_for(Session, "after_flush")
+def _collect_users(session, flush_context):
+    changed = {obj.id for obj in chain(session.dirty, session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("changed_users", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session):
+    for user_id in session.info.pop("changed_users", ()):
+        token_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("changed_users", None)
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from backend import couples, passwords, storage
 from backend.database import get_db
 from backend.models import User
+from backend.token_cache import token_cache
 from backend.schemas import UserCreate, UserLogin, UserProfile, UserOut
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import os
@@ -14,18 +15,11 @@ SECRET_KEY = os.environ.get("JWT_SECRET", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
 router = APIRouter(prefix="/user", tags=["user"])
 
 # Utility functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -38,17 +32,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
+    user_id = token_cache.user_id(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id = int(payload.get("sub"))
+        except (JWTError, TypeError, ValueError):
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+        token_cache.add_token(token, payload.get("exp"), user_id)
+    user = token_cache.get_user(user_id)
     if user is None:
-        raise credentials_exception
+        since_epoch = token_cache.epoch
+        result = await db.execute(select(User).filter(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise credentials_exception
+        # Shared with later requests: keep it out of this session's changes
+        db.expunge(user)
+        token_cache.set_user(user, since_epoch)
     return user
 
 # Registration endpoint
@@ -57,7 +58,9 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).filter(User.email == user.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pw = get_password_hash(user.password)
+    if user.couple_code and not await couples.index.contains(user.couple_code):
+        raise HTTPException(status_code=400, detail="Unknown couple code")
+    hashed_pw = await passwords.hash_password(user.password)
     db_user = User(
         email=user.email,
         password_hash=hashed_pw,
@@ -75,8 +78,13 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).filter(User.email == form_data.username))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    verified, new_hash = await passwords.verify_password(form_data.password, user.password_hash if user else None)
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # Stored with older hashing parameters; upgrade while we have the password
+        user.password_hash = new_hash
+        await db.commit()
     access_token = create_access_token(data={"sub": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer", "user": UserOut.from_orm(user)}
 
@@ -88,21 +96,25 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 # Update profile
 @router.put("/profile", response_model=UserOut)
 async def update_profile(profile: UserProfile, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if profile.couple_code and not await couples.index.contains(profile.couple_code):
+        raise HTTPException(status_code=400, detail="Unknown couple code")
+    # current_user may be the cached copy; write through a row of this session
+    user = await db.get(User, current_user.id)
     for attr, value in profile.dict(exclude_unset=True).items():
-        setattr(current_user, attr, value)
+        setattr(user, attr, value)
     await db.commit()
-    await db.refresh(current_user)
-    return current_user
+    await db.refresh(user)
+    return user
 
 # Upload/change profile picture
 @router.post("/profile/picture", response_model=UserOut)
 async def upload_profile_picture(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     upload_dir = os.path.join(os.path.dirname(__file__), "uploads", "profile_pics")
     os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"user_{current_user.id}_{file.filename}")
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    current_user.profile_pic = f"profile_pics/user_{current_user.id}_{file.filename}"
+    filename = f"user_{current_user.id}_{storage.safe_name(file.filename)}"
+    await storage.save_upload(file, upload_dir, filename, storage.MAX_PROFILE_PICTURE_BYTES)
+    user = await db.get(User, current_user.id)
+    user.profile_pic = f"profile_pics/{filename}"
     await db.commit()
-    await db.refresh(current_user)
-    return current_user
+    await db.refresh(user)
+    return user
@@ -8,6 +8,10 @@ interface Photo {
   uploaded_at: string;
 }
 
+// Resized WebP copies served by /photos/file/{name}?size=
+const photoUrl = (filePath: string, size: 'thumb' | 'small' | 'medium') =>
+  `${api.defaults.baseURL}/photos/file/${encodeURIComponent(filePath.split('/').pop() || '')}?size=${size}`;
+
 interface ActivityGalleryProps {
   activityId?: number;
   blogEntryId?: number;
@@ -42,12 +46,19 @@ export default function ActivityGallery({ activityId, blogEntryId }: ActivityGal
       <ImageList cols={3} gap={8}>
         {photos.map((photo) => (
           <ImageListItem key={photo.id} onClick={() => { setSelected(photo.file_path); setOpen(true); }} sx={{ cursor: 'pointer' }}>
-            <img src={`${api.defaults.baseURL}/${photo.file_path}`} alt="activity" style={{ borderRadius: 8, width: '100%', height: 'auto' }} />
+            <img
+              src={photoUrl(photo.file_path, 'small')}
+              srcSet={`${photoUrl(photo.file_path, 'thumb')} 256w, ${photoUrl(photo.file_path, 'small')} 640w`}
+              sizes="(max-width: 600px) 33vw, 256px"
+              loading="lazy"
+              alt="activity"
+              style={{ borderRadius: 8, width: '100%', height: 'auto' }}
+            />
           </ImageListItem>
         ))}
       </ImageList>
       <Dialog open={open} onClose={() => setOpen(false)} maxWidth="md">
-        {selected && <img src={`${api.defaults.baseURL}/${selected}`} alt="full" style={{ maxWidth: 600, width: '100%' }} />}
+        {selected && <img src={photoUrl(selected, 'medium')} alt="full" style={{ maxWidth: 600, width: '100%' }} />}
       </Dialog>
     </Box>
   );
@@ -1,6 +1,6 @@
 import React from 'react';
 import { Box, Chip, Tooltip } from '@mui/material';
-import { FaRegSmileBeam, FaRegCheckCircle, FaRegClock, FaTrophy, FaStar, FaHeart, FaBirthdayCake, FaBook, FaCamera, FaChartLine } from 'react-icons/fa';
+import { FaRegSmileBeam, FaRegCheckCircle, FaRegClock, FaTrophy, FaStar, FaHeart, FaBirthdayCake, FaBook, FaCamera, FaChartLine, FaPenNib, FaMountain, FaHome, FaUtensils, FaTheaterMasks, FaGlobeAmericas } from 'react-icons/fa';
 import { GiRibbonMedal, GiPresent } from 'react-icons/gi';
 
 export type BadgeType = {
@@ -27,6 +27,12 @@ const BADGE_LIST: Omit<BadgeType, 'earned'>[] = [
   { key: 'streak_master', name: 'Streak Master', description: 'Achieve a 30-day activity streak', icon: <FaStar color="#FFD36E" /> },
   { key: 'early_bird', name: 'Early Bird', description: 'Log an activity before 8am, 5 times', icon: <FaRegClock color="#43a047" /> },
   { key: 'night_owl', name: 'Night Owl', description: 'Log an activity after 10pm, 5 times', icon: <FaRegClock color="#607d8b" /> },
+  { key: 'storytellers', name: 'Storytellers', description: 'Write 25 blog entries together', icon: <FaPenNib color="#B388FF" /> },
+  { key: 'outdoor_adventurers', name: 'Outdoor Adventurers', description: 'Complete 5 outdoor activities', icon: <FaMountain color="#43a047" /> },
+  { key: 'homebodies', name: 'Homebodies', description: 'Complete 5 indoor activities', icon: <FaHome color="#ff9800" /> },
+  { key: 'foodies', name: 'Foodies', description: 'Complete 5 dining activities', icon: <FaUtensils color="#e91e63" /> },
+  { key: 'fun_seekers', name: 'Fun Seekers', description: 'Complete 5 entertainment activities', icon: <FaTheaterMasks color="#FF7EB9" /> },
+  { key: 'globetrotters', name: 'Globetrotters', description: 'Complete 5 travel activities', icon: <FaGlobeAmericas color="#2196f3" /> },
 ];
 
 export default function Badges({ badges }: { badges: Record<string, boolean> }) {
@@ -10,10 +10,12 @@ import {
 } from '@mui/material';
 import { useNavigate } from 'react-router-dom';
 import { useCouple } from '../contexts/CoupleContext';
+import api from '../utils/axiosConfig';
 
 const CodeEntry = () => {
     const [code, setCode] = useState('');
     const [newCode, setNewCode] = useState('');
+    const [error, setError] = useState('');
     const { setCode: saveCode } = useCouple();
     const navigate = useNavigate();
 
@@ -27,15 +29,32 @@ const CodeEntry = () => {
         setNewCode(result);
     };
 
-    const handleJoin = () => {
+    const handleJoin = async () => {
         if (code.length === 6) {
+            try {
+                await api.get(`/couples/${code.toUpperCase()}`);
+            } catch (err) {
+                setError('No couple uses that code. Check it with your partner.');
+                return;
+            }
             saveCode(code.toUpperCase());
             navigate('/activities');
         }
     };
 
-    const handleCreate = () => {
+    const handleCreate = async () => {
         if (newCode) {
+            try {
+                // Codes must be registered before the API accepts them
+                await api.post('/couples', { code: newCode });
+            } catch (err: any) {
+                if (err.response?.status === 409) {
+                    // Taken by another couple: offer a fresh one
+                    generateNewCode();
+                }
+                setError('Could not create that couple code, please try again.');
+                return;
+            }
             saveCode(newCode);
             navigate('/activities');
         } else {
@@ -62,6 +81,12 @@ const CodeEntry = () => {
                             Share activities, books, movies, and memories with your partner
                         </Typography>
 
+                        {error && (
+                            <Alert severity="error" sx={{ mt: 2 }}>
+                                {error}
+                            </Alert>
+                        )}
+
                         <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: 'center', gap: 2, mt: 4 }}>
                             <Typography variant="h6" gutterBottom>
                                 Join Existing Couple
@@ -74,6 +74,28 @@ api.interceptors.request.use(
   }
 );
 
+// List endpoints return one page at a time, with the next page's cursor in
+// the X-Next-Cursor header. Callers that didn't ask for a particular page
+// get every page, joined into one array.
+const MAX_PAGE_SIZE = 200;
+api.interceptors.response.use(async (response) => {
+  const params = response.config.params || {};
+  let cursor = response.headers['x-next-cursor'];
+  if (!cursor || params.cursor || !Array.isArray(response.data)) {
+    return response;
+  }
+  let items = response.data;
+  while (cursor) {
+    const page = await api.get(response.config.url || '', {
+      params: { ...params, limit: MAX_PAGE_SIZE, cursor }
+    });
+    items = items.concat(page.data);
+    cursor = page.headers['x-next-cursor'];
+  }
+  response.data = items;
+  return response;
+});
+
 // Cache successful GET responses
 api.interceptors.response.use((response) => {
   // Only cache GET requests
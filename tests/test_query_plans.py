@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+from backend.query_plans import QUERIES, collect_plans, full_scans
+
+# Every list query must be served from an index: a full table scan or a
+# sort step makes a page cost grow with the couple's history. See
+# backend/query_plans.py, which also prints the plans:
+#
+#   python -m backend.query_plans
+
+@pytest.fixture(scope="module")
+def plans():
+    by_label = {}
+    for label, statement, plan in asyncio.run(collect_plans()):
+        by_label.setdefault(label, []).append((statement, plan))
+    return by_label
+
+@pytest.mark.parametrize("label", [label for label, _ in QUERIES])
+def test_query_uses_indexes(plans, label):
+    assert plans.get(label), f"{label} issued no SELECT"
+    for statement, plan in plans[label]:
+        assert not full_scans(plan), f"{label}:\n{statement}\n" + "\n".join(plan)
+
+def test_full_scans_flags_scans_and_sorts():
+    assert full_scans(["SCAN activities"]) == ["SCAN activities"]
+    assert full_scans(["USE TEMP B-TREE FOR ORDER BY"]) == ["USE TEMP B-TREE FOR ORDER BY"]
+    assert full_scans(["SEARCH activities USING INDEX ix_activities_couple_created (couple_code=?)"]) == []
+    assert full_scans(["SCAN challenges"]) == []
+    # A constrained virtual table lookup reports a non-empty index string
+    assert full_scans(["SCAN search_index VIRTUAL TABLE INDEX 0:M2"]) == []
+    assert full_scans(["SCAN search_index VIRTUAL TABLE INDEX 0:"]) == ["SCAN search_index VIRTUAL TABLE INDEX 0:"]